@@ -1,140 +1,463 @@
-from anthropic import Anthropic
+from anthropic import Anthropic, AsyncAnthropic, RateLimitError, Timeout
+import asyncio
+import copy
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import cv2
 import numpy as np
-import base64
-import json
-from typing import Dict, Any, Optional
+import orjson
+import binascii
+import re
+import string
+import time
+from functools import lru_cache
+from typing import Dict, Any, FrozenSet, List, Optional, Tuple, TypedDict, Union
 import os
-from dotenv import load_dotenv
+from config import Config
 
-load_dotenv()
+# Optional libjpeg-turbo encoder, used instead of cv2.imencode when enabled
+_TURBOJPEG = None
+if Config.USE_TURBOJPEG:
+    try:
+        from turbojpeg import TurboJPEG, TJPF_BGR, TJPF_GRAY, TJSAMP_GRAY
+        _TURBOJPEG = TurboJPEG()
+    except (ImportError, OSError, RuntimeError) as e:  # libturbojpeg not found (RuntimeError on PyTurboJPEG 2.x)
+        print(f"TurboJPEG unavailable, falling back to OpenCV JPEG encoder: {e}")
+
+# Outermost {...} span, also matches JSON wrapped in markdown fences
+_JSON_RE = re.compile(r"\{.*\}", re.DOTALL)
+
+class _AnalysisResultBase(TypedDict, total=False):
+    """Keys any analysis result may carry, including fallback and bookkeeping keys"""
+    analysis: str
+    confidence: float
+    timestamp: str
+    raw_response: bool
+    error: str
+    cached: bool
+    unchanged: bool
+    image_index: int
+
+class ObjectDetectionResult(_AnalysisResultBase, total=False):
+    objects: List[Dict[str, Any]]
+
+class DefectAnalysisResult(_AnalysisResultBase, total=False):
+    defects: List[Dict[str, Any]]
+    quality_score: float
+
+class AssetTrackingResult(_AnalysisResultBase, total=False):
+    assets: List[Dict[str, Any]]
+
+class GeneralAnalysisResult(_AnalysisResultBase, total=False):
+    objects: List[Dict[str, Any]]
+    safety_hazards: List[Any]
+    scene_description: str
+    activity_level: str
+
+AnalysisResult = Union[ObjectDetectionResult, DefectAnalysisResult,
+                       AssetTrackingResult, GeneralAnalysisResult]
+
+_OPEN_BRACE = ord('{')
+_CLOSE_BRACE = ord('}')
+
+def _phash64_py(gray8x8: np.ndarray) -> int:
+    """Pack an 8x8 gray image into a 64-bit average hash, MSB first"""
+    bits = np.packbits(gray8x8 > gray8x8.mean())
+    return int(bits.view('>u8')[0])
+
+def _find_balanced_json_py(buf: np.ndarray) -> Tuple[int, int]:
+    """Find the [start, end) span of the first balanced {...} in a uint8 buffer
+    
+    Returns (-1, -1) if there is no opening brace or it is never closed.
+    """
+    opens = buf == _OPEN_BRACE
+    if not opens.any():
+        return -1, -1
+    start = int(np.argmax(opens))
+    tail = buf[start:]
+    depth = np.cumsum((tail == _OPEN_BRACE).astype(np.int32) - (tail == _CLOSE_BRACE))
+    ends = np.flatnonzero(depth == 0)
+    if not ends.size:
+        return -1, -1
+    return start, start + int(ends[0]) + 1
+
+# Numba is optional: compile the per-frame helpers to native code when available
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+if njit is not None:
+    @njit(cache=True)
+    def _phash64_jit(gray8x8):
+        flat = gray8x8.ravel()
+        total = 0.0
+        for v in flat:
+            total += v
+        mean = total / flat.size
+        h = np.uint64(0)
+        for v in flat:
+            h = (h << np.uint64(1)) | np.uint64(1 if v > mean else 0)
+        return h
+    
+    @njit(cache=True)
+    def _find_balanced_json_jit(buf):
+        depth = 0
+        start = -1
+        for i in range(buf.size):
+            c = buf[i]
+            if c == 123:  # '{'
+                if start == -1:
+                    start = i
+                depth += 1
+            elif c == 125 and start != -1:  # '}'
+                depth -= 1
+                if depth == 0:
+                    return start, i + 1
+        return -1, -1
+    
+    def _phash64(gray8x8: np.ndarray) -> int:
+        return int(_phash64_jit(np.ascontiguousarray(gray8x8)))
+    
+    def _find_balanced_json(buf: np.ndarray) -> Tuple[int, int]:
+        start, end = _find_balanced_json_jit(buf)
+        return int(start), int(end)
+    
+    # Compile at import so the first frame doesn't pay for it
+    _phash64(np.zeros((8, 8), dtype=np.uint8))
+    _find_balanced_json(np.frombuffer(b'{}', dtype=np.uint8))
+else:
+    _phash64 = _phash64_py
+    _find_balanced_json = _find_balanced_json_py
+
+# Shared client so every stream reuses one keep-alive connection pool
+_ANTHROPIC_CLIENT: Optional[Anthropic] = None
+_ANTHROPIC_CLIENT_LOCK = threading.Lock()
+
+def _get_client() -> Anthropic:
+    """Get the process-wide Anthropic client, creating it on first use"""
+    global _ANTHROPIC_CLIENT
+    if _ANTHROPIC_CLIENT is None:
+        with _ANTHROPIC_CLIENT_LOCK:
+            if _ANTHROPIC_CLIENT is None:
+                # The SDK's default pool keeps far more than MAX_CONCURRENT_STREAMS
+                # connections alive, so only the timeout needs tuning
+                _ANTHROPIC_CLIENT = Anthropic(
+                    api_key=os.getenv('ANTHROPIC_API_KEY'),
+                    timeout=Timeout(Config.AI_PROCESSING_TIMEOUT, connect=5.0)
+                )
+    return _ANTHROPIC_CLIENT
+
+# Files API ids by exact JPEG digest, shared by every processor so a frame
+# analyzed by several models is uploaded once; oldest uploads are deleted
+# remotely once MAX_RESULTS ids are held
+_FILE_IDS: "OrderedDict[bytes, str]" = OrderedDict()
+_FILE_IDS_LOCK = threading.Lock()
 
 class AnthropicAIProcessor:
+    MODEL = "claude-3-5-sonnet-20241022"
+    MAX_RETRIES = 3
+    JPEG_QUALITY = 85
+    MAX_IMAGE_EDGE = 1568
+    CACHE_HAMMING_DISTANCE = 4  # Max differing pHash bits for a near-duplicate
+    CACHE_SCAN_WINDOW = 32  # Recent cache keys checked for near-duplicates
+    FILES_API_BETA = "files-api-2025-04-14"
+    SCENE_CHANGE_THRESHOLD = 0.05  # Chi-square histogram distance below which a scene is unchanged
+    
+    # Analysis prompt templates, compiled once at class load. Placeholders
+    # ($name) are filled from the prompt_params passed to analyze_frame.
+    _PROMPT_TEMPLATES: Dict[str, string.Template] = {
+        "object_detection": string.Template("""
+        Analyze this image and identify all objects visible. For each object, provide:
+        1. Object type/class
+        2. Confidence level (0-1)
+        3. Approximate location description
+        4. Size estimation (small/medium/large)
+        
+        Return the response in JSON format with an 'objects' array.
+        """),
+        
+        "defect_analysis": string.Template("""
+        Examine this image for any defects, anomalies, or quality issues. Look for:
+        1. Scratches, dents, or surface damage
+        2. Color inconsistencies
+        3. Structural problems
+        4. Missing components
+        
+        For each defect found, provide:
+        - Type of defect
+        - Severity level (minor/moderate/severe)
+        - Location description
+        - Confidence level
+        
+        Also provide an overall quality score (0-1). Return in JSON format.
+        """),
+        
+        "asset_tracking": string.Template("""
+        Analyze this image to identify and track assets/equipment. Look for:
+        1. Industrial equipment
+        2. Vehicles
+        3. People/personnel
+        4. Tools or machinery
+        5. Safety equipment
+        
+        For each asset, provide:
+        - Asset type
+        - Status (operational/maintenance/inactive)
+        - Location in frame
+        - Any safety concerns
+        
+        Return in JSON format with an 'assets' array.
+        """),
+        
+        "general": string.Template("""
+        Perform a comprehensive analysis of this image. Identify:
+        1. All visible objects and their types
+        2. Any potential safety hazards
+        3. Overall scene description
+        4. Activity level (high/medium/low)
+        5. Any anomalies or points of interest
+        
+        Return the analysis in JSON format.
+        """)
+    }
+    
+    # Static text blocks reused verbatim by every request without prompt_params
+    _PROMPT_BLOCKS: Dict[str, Dict[str, str]] = {
+        name: {"type": "text", "text": template.safe_substitute()}
+        for name, template in _PROMPT_TEMPLATES.items()
+    }
+    
     def __init__(self):
-        self.client = Anthropic(
-            api_key=os.getenv('ANTHROPIC_API_KEY')
+        self.client = _get_client()
+        # Results cache keyed by (pHash, (stream_id, prompt)) for near-duplicate frames
+        self._cache: "OrderedDict[Tuple[int, tuple], Dict[str, Any]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # JPEG encoding releases the GIL, so frames encode in parallel here
+        self._executor = ThreadPoolExecutor(max_workers=Config.THREAD_POOL_SIZE)
+        # Files API uploads skip base64 inflation (off by default, see USE_FILES_API)
+        self.use_files_api = (Config.USE_FILES_API and
+                              hasattr(self.client, "beta") and hasattr(self.client.beta, "files"))
+        # Last accepted (histogram, result) per (stream, prompt) for scene-change detection
+        self._scene_state: "OrderedDict[tuple, Tuple[np.ndarray, Dict[str, Any]]]" = OrderedDict()
+        # Per-thread scratch buffers reused across frames of the same size
+        self._buffers = threading.local()
+    
+    def forget_stream(self, stream_id: str):
+        """Drop the scene-change state and cached results kept for a removed stream"""
+        with self._cache_lock:
+            for key in [key for key in self._scene_state if key[0] == stream_id]:
+                del self._scene_state[key]
+            for key in [key for key in self._cache if key[1][0] == stream_id]:
+                del self._cache[key]
+    
+    def close(self):
+        """Release the encoder thread pool"""
+        self._executor.shutdown(wait=False)
+    
+    def __del__(self):
+        executor = getattr(self, "_executor", None)
+        if executor is not None:
+            executor.shutdown(wait=False)
+    
+    def encode_image(self, image: np.ndarray, max_edge: int = MAX_IMAGE_EDGE,
+                     analysis_type: Optional[str] = None) -> str:
+        """Convert OpenCV image to base64 string, downscaled to at most max_edge pixels"""
+        jpeg_bytes = self.encode_jpeg(image, max_edge, analysis_type)
+        return binascii.b2a_base64(jpeg_bytes, newline=False).decode('ascii')
+    
+    def encode_jpeg(self, image: np.ndarray, max_edge: int = MAX_IMAGE_EDGE,
+                    analysis_type: Optional[str] = None) -> bytes:
+        """Convert OpenCV image to JPEG bytes, downscaled to at most max_edge pixels
+        
+        Frames for color-insensitive analysis types are encoded as single-channel JPEG.
+        """
+        # Claude Vision resizes anything larger itself, so don't pay to upload it
+        h, w = image.shape[:2]
+        scale = min(1.0, max_edge / max(h, w))
+        if scale < 1.0:
+            image = self._resize_into_buffer(image, (int(w * scale), int(h * scale)))
+        
+        if analysis_type in Config.GRAYSCALE_ANALYSIS_TYPES and image.ndim == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        
+        # Quality 85 is visually lossless for Claude Vision and much smaller on the wire
+        if _TURBOJPEG is not None:
+            image = np.ascontiguousarray(image)
+            if image.ndim == 2:
+                # libjpeg-turbo can't convert gray input to YCbCr, so gray
+                # frames must be written as a grayscale JPEG
+                return _TURBOJPEG.encode(image, quality=self.JPEG_QUALITY,
+                                         pixel_format=TJPF_GRAY, jpeg_subsample=TJSAMP_GRAY)
+            return _TURBOJPEG.encode(image, quality=self.JPEG_QUALITY, pixel_format=TJPF_BGR)
+        _, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, self.JPEG_QUALITY])
+        return buffer.tobytes()
+    
+    def _gray_histogram(self, image: np.ndarray) -> np.ndarray:
+        """Compute a normalized 32-bin grayscale histogram of a downscaled frame"""
+        small = cv2.resize(image, (160, 120), interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        hist = cv2.calcHist([small], [0], None, [32], [0, 256])
+        cv2.normalize(hist, hist)
+        return hist
+    
+    def _resize_into_buffer(self, image: np.ndarray, size: Tuple[int, int]) -> np.ndarray:
+        """Resize into a reused per-thread buffer; only reallocated when the size changes"""
+        shape = (size[1], size[0]) + image.shape[2:]
+        buffer = getattr(self._buffers, "resize", None)
+        if buffer is None or buffer.shape != shape or buffer.dtype != image.dtype:
+            buffer = np.empty(shape, dtype=image.dtype)
+            self._buffers.resize = buffer
+        return cv2.resize(image, size, dst=buffer, interpolation=cv2.INTER_AREA)
+    
+    def _upload_jpeg(self, jpeg_bytes: bytes) -> str:
+        """Upload JPEG bytes through the Files API and return the file id"""
+        uploaded = self.client.beta.files.upload(
+            file=("frame.jpg", jpeg_bytes, "image/jpeg"),
+            betas=[self.FILES_API_BETA]
         )
+        return uploaded.id
+    
+    def _delete_files(self, file_ids: List[str]):
+        """Delete evicted uploads so they don't accumulate in Files API storage"""
+        for file_id in file_ids:
+            try:
+                self.client.beta.files.delete(file_id, betas=[self.FILES_API_BETA])
+            except Exception as e:
+                print(f"Failed to delete uploaded frame {file_id}: {e}")
     
-    def encode_image(self, image: np.ndarray) -> str:
-        """Convert OpenCV image to base64 string"""
-        _, buffer = cv2.imencode('.jpg', image)
-        image_base64 = base64.b64encode(buffer).decode('utf-8')
-        return image_base64
+    def _get_file_id(self, frame: np.ndarray, analysis_type: str) -> str:
+        """Get the uploaded file id for a frame, uploading it on first sight"""
+        jpeg_bytes = self.encode_jpeg(frame, analysis_type=analysis_type)
+        # Exact digest: only byte-identical images may share an upload
+        key = hashlib.blake2b(jpeg_bytes, digest_size=16).digest()
+        with _FILE_IDS_LOCK:
+            file_id = _FILE_IDS.get(key)
+            if file_id is not None:
+                _FILE_IDS.move_to_end(key)
+                return file_id
+        
+        file_id = self._upload_jpeg(jpeg_bytes)
+        evicted = []
+        with _FILE_IDS_LOCK:
+            existing = _FILE_IDS.get(key)
+            if existing is not None:
+                # Another thread uploaded the same image meanwhile; keep theirs
+                evicted.append(file_id)
+                file_id = existing
+            else:
+                _FILE_IDS[key] = file_id
+                while len(_FILE_IDS) > Config.MAX_RESULTS:
+                    evicted.append(_FILE_IDS.popitem(last=False)[1])
+        self._delete_files(evicted)
+        return file_id
     
-    def analyze_frame(self, frame: np.ndarray, analysis_type: str = "general") -> Dict[str, Any]:
-        """Analyze frame using Anthropic Claude Vision"""
-        try:
-            image_base64 = self.encode_image(frame)
-            
-            # Define different prompts based on analysis type
-            prompts = {
-                "object_detection": """
-                Analyze this image and identify all objects visible. For each object, provide:
-                1. Object type/class
-                2. Confidence level (0-1)
-                3. Approximate location description
-                4. Size estimation (small/medium/large)
-                
-                Return the response in JSON format with an 'objects' array.
-                """,
-                
-                "defect_analysis": """
-                Examine this image for any defects, anomalies, or quality issues. Look for:
-                1. Scratches, dents, or surface damage
-                2. Color inconsistencies
-                3. Structural problems
-                4. Missing components
-                
-                For each defect found, provide:
-                - Type of defect
-                - Severity level (minor/moderate/severe)
-                - Location description
-                - Confidence level
-                
-                Also provide an overall quality score (0-1). Return in JSON format.
-                """,
-                
-                "asset_tracking": """
-                Analyze this image to identify and track assets/equipment. Look for:
-                1. Industrial equipment
-                2. Vehicles
-                3. People/personnel
-                4. Tools or machinery
-                5. Safety equipment
-                
-                For each asset, provide:
-                - Asset type
-                - Status (operational/maintenance/inactive)
-                - Location in frame
-                - Any safety concerns
-                
-                Return in JSON format with an 'assets' array.
-                """,
-                
-                "general": """
-                Perform a comprehensive analysis of this image. Identify:
-                1. All visible objects and their types
-                2. Any potential safety hazards
-                3. Overall scene description
-                4. Activity level (high/medium/low)
-                5. Any anomalies or points of interest
-                
-                Return the analysis in JSON format.
-                """
+    def _phash(self, image: np.ndarray) -> int:
+        """Compute a 64-bit average hash of the image for near-duplicate lookup"""
+        # Shrink before the gray conversion so no full-size gray frame is allocated
+        small = cv2.resize(image, (8, 8), interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return _phash64(small)
+    
+    def _cache_get(self, frame_hash: int, scene_key: tuple) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached result for an identical or near-identical frame
+        
+        scene_key is (stream_id, prompt_key): similar-looking frames from another
+        stream never share a result.
+        """
+        with self._cache_lock:
+            key = (frame_hash, scene_key)
+            if key not in self._cache:
+                key = None
+                recent = reversed(self._cache)
+                for _ in range(min(self.CACHE_SCAN_WINDOW, len(self._cache))):
+                    candidate = next(recent)
+                    if (candidate[1] == scene_key and
+                            bin(candidate[0] ^ frame_hash).count("1") <= self.CACHE_HAMMING_DISTANCE):
+                        key = candidate
+                        break
+                if key is None:
+                    return None
+            self._cache.move_to_end(key)
+            result = copy.deepcopy(self._cache[key])
+        result["cached"] = True
+        return result
+    
+    def _cache_put(self, frame_hash: int, scene_key: tuple, result: Dict[str, Any]):
+        """Store a result, evicting the least recently used entry past MAX_RESULTS"""
+        with self._cache_lock:
+            self._cache[(frame_hash, scene_key)] = copy.deepcopy(result)
+            self._cache.move_to_end((frame_hash, scene_key))
+            while len(self._cache) > Config.MAX_RESULTS:
+                self._cache.popitem(last=False)
+    
+    def _scene_put(self, scene_key: tuple, hist: np.ndarray, result: Dict[str, Any]):
+        """Record a stream's last accepted frame, evicting the stalest past MAX_RESULTS"""
+        with self._cache_lock:
+            self._scene_state[scene_key] = (hist, result)
+            self._scene_state.move_to_end(scene_key)
+            while len(self._scene_state) > Config.MAX_RESULTS:
+                self._scene_state.popitem(last=False)
+    
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def _render_prompt(analysis_type: str, params: FrozenSet[Tuple[str, str]]) -> str:
+        """Render a prompt template; identical parameter sets are served from cache"""
+        templates = AnthropicAIProcessor._PROMPT_TEMPLATES
+        return templates.get(analysis_type, templates["general"]).substitute(dict(params))
+    
+    def _build_messages(self, image_base64: Optional[str], analysis_type: str,
+                        prompt_params: Optional[Dict[str, str]] = None,
+                        file_id: Optional[str] = None,
+                        prompt_block: Optional[Dict[str, str]] = None) -> list:
+        """Build the Claude Vision message payload for one image"""
+        if file_id:
+            image_source = {"type": "file", "file_id": file_id}
+        else:
+            image_source = {
+                "type": "base64",
+                "media_type": "image/jpeg",
+                "data": image_base64
             }
-            
-            prompt = prompts.get(analysis_type, prompts["general"])
-            
-            message = self.client.messages.create(
-                model="claude-3-5-sonnet-20241022",
-                max_tokens=1000,
-                messages=[
+        
+        if prompt_block is None and prompt_params:
+            prompt_block = {
+                "type": "text",
+                "text": self._render_prompt(analysis_type, frozenset(prompt_params.items()))
+            }
+        elif prompt_block is None:
+            prompt_block = self._PROMPT_BLOCKS.get(analysis_type, self._PROMPT_BLOCKS["general"])
+        
+        return [
+            {
+                "role": "user",
+                "content": [
                     {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "image",
-                                "source": {
-                                    "type": "base64",
-                                    "media_type": "image/jpeg",
-                                    "data": image_base64
-                                }
-                            },
-                            {
-                                "type": "text",
-                                "text": prompt
-                            }
-                        ]
-                    }
+                        "type": "image",
+                        "source": image_source
+                    },
+                    prompt_block
                 ]
-            )
-            
-            # Parse the response
-            response_text = message.content[0].text
-            
-            # Try to extract JSON from the response
-            try:
-                # Find JSON in the response
-                start_idx = response_text.find('{')
-                end_idx = response_text.rfind('}') + 1
-                if start_idx != -1 and end_idx > start_idx:
-                    json_str = response_text[start_idx:end_idx]
-                    return json.loads(json_str)
-                else:
-                    # Fallback: return structured response
-                    return {
-                        "analysis": response_text,
-                        "confidence": 0.8,
-                        "timestamp": "N/A"
-                    }
-            except json.JSONDecodeError:
-                # If JSON parsing fails, return the raw text analysis
-                return {
-                    "analysis": response_text,
-                    "confidence": 0.8,
-                    "raw_response": True
-                }
-                
+            }
+        ]
+    
+    def analyze_frame(self, frame: np.ndarray, analysis_type: str = "general",
+                      prompt_params: Optional[Dict[str, str]] = None,
+                      stream_id: Optional[str] = None) -> AnalysisResult:
+        """Analyze frame using Anthropic Claude Vision
+        
+        Pass stream_id when frames from several streams share this processor, so
+        scene-change detection compares each frame against its own stream.
+        """
+        try:
+            prompt_key = (analysis_type, frozenset(prompt_params.items()) if prompt_params else None)
+            return self._analyze(frame, prompt_key, analysis_type, stream_id,
+                                 lambda image_base64, file_id: self._build_messages(
+                                     image_base64, analysis_type, prompt_params, file_id))
         except Exception as e:
             print(f"Error in Anthropic analysis: {e}")
             return {
@@ -143,11 +466,296 @@ class AnthropicAIProcessor:
                 "confidence": 0.0
             }
     
-    def batch_analyze_images(self, images: list, analysis_type: str = "general") -> list:
-        """Analyze multiple images in batch"""
-        results = []
-        for i, image in enumerate(images):
-            result = self.analyze_frame(image, analysis_type)
-            result["image_index"] = i
-            results.append(result)
+    def analyze_frame_multi(self, frame: np.ndarray, analysis_types: List[str],
+                            stream_id: Optional[str] = None) -> Dict[str, AnalysisResult]:
+        """Run several analysis types on one frame with a single Claude Vision request
+        
+        The frame is encoded and uploaded once; the combined answer is split back
+        into one result per analysis type.
+        """
+        analysis_types = list(dict.fromkeys(analysis_types))
+        if len(analysis_types) == 1:
+            return {analysis_types[0]: self.analyze_frame(frame, analysis_types[0], stream_id=stream_id)}
+        
+        try:
+            types_key = tuple(analysis_types)
+            prompt_block = {"type": "text", "text": self._render_combined_prompt(types_key)}
+            # Only drop color when every requested analysis is color-insensitive
+            encode_type = (analysis_types[0] if all(t in Config.GRAYSCALE_ANALYSIS_TYPES for t in analysis_types)
+                           else None)
+            combined = self._analyze(frame, (types_key, None), encode_type, stream_id,
+                                     lambda image_base64, file_id: self._build_messages(
+                                         image_base64, "general", file_id=file_id, prompt_block=prompt_block),
+                                     max_tokens=1000 * len(analysis_types))
+        except Exception as e:
+            print(f"Error in Anthropic analysis: {e}")
+            combined = {
+                "error": str(e),
+                "analysis": "Analysis failed",
+                "confidence": 0.0
+            }
+        
+        results = {}
+        for analysis_type in analysis_types:
+            section = combined.get(analysis_type)
+            # A response that ignored the requested layout is passed to every type as-is
+            result = dict(section) if isinstance(section, dict) else copy.deepcopy(combined)
+            for flag in ("cached", "unchanged"):
+                if flag in combined:
+                    result[flag] = combined[flag]
+            results[analysis_type] = result
         return results
+    
+    @staticmethod
+    @lru_cache(maxsize=16)
+    def _render_combined_prompt(analysis_types: Tuple[str, ...]) -> str:
+        """Merge the prompts of several analysis types into one request"""
+        blocks = AnthropicAIProcessor._PROMPT_BLOCKS
+        sections = "\n".join(
+            f'"{analysis_type}":{blocks.get(analysis_type, blocks["general"])["text"]}'
+            for analysis_type in analysis_types
+        )
+        keys = ", ".join(f'"{analysis_type}"' for analysis_type in analysis_types)
+        return (f"Perform each of the following analyses on this image. Return a single JSON "
+                f"object with the keys {keys}, each holding the JSON result of that analysis.\n"
+                f"{sections}")
+    
+    def _analyze(self, frame: np.ndarray, prompt_key: tuple, encode_type: Optional[str],
+                 stream_id: Optional[str], build_messages, max_tokens: int = 1000) -> Dict[str, Any]:
+        """Shared request path: scene-change skip, near-duplicate cache, upload, streamed parse"""
+        # Skip the whole call while the stream's scene hasn't changed
+        scene_key = (stream_id, prompt_key)
+        hist = self._gray_histogram(frame)
+        previous = self._scene_state.get(scene_key)
+        if (previous is not None and
+                cv2.compareHist(previous[0], hist, cv2.HISTCMP_CHISQR) < self.SCENE_CHANGE_THRESHOLD):
+            with self._cache_lock:
+                if scene_key in self._scene_state:
+                    self._scene_state.move_to_end(scene_key)
+            result = copy.deepcopy(previous[1])
+            result["unchanged"] = True
+            return result
+        
+        # Near-duplicate frames reuse the stream's previous analysis for the same prompt
+        frame_hash = self._phash(frame)
+        cached = self._cache_get(frame_hash, scene_key)
+        if cached is not None:
+            self._scene_put(scene_key, hist, cached)
+            return cached
+        
+        request = {"model": self.MODEL, "max_tokens": max_tokens}
+        messages_api = self.client.messages
+        file_id = None
+        if self.use_files_api:
+            try:
+                file_id = self._get_file_id(frame, encode_type)
+                messages_api = self.client.beta.messages
+                request["betas"] = [self.FILES_API_BETA]
+            except Exception as e:
+                print(f"Files API upload failed, sending base64 instead: {e}")
+        image_base64 = None if file_id else self.encode_image(frame, analysis_type=encode_type)
+        request["messages"] = build_messages(image_base64, file_id)
+        
+        # Stream the response and stop as soon as a complete JSON object arrives
+        chunks = []
+        depth = 0
+        result = None
+        with messages_api.stream(**request) as stream:
+            for text in stream.text_stream:
+                chunks.append(text)
+                depth, closed = self._balanced(text, depth)
+                if closed:
+                    result = self._extract_json("".join(chunks))
+                    if result is not None:
+                        break
+        
+        # Parse the full response if it never produced a usable object
+        if result is None:
+            result = self._parse_response_text("".join(chunks))
+        self._cache_put(frame_hash, scene_key, result)
+        self._scene_put(scene_key, hist, result)
+        return result
+    
+    def _balanced(self, text: str, depth: int) -> Tuple[int, bool]:
+        """Track {/} nesting over a streamed chunk, reporting whether an object closed"""
+        closed = False
+        for ch in text:
+            if ch == '{':
+                depth += 1
+            elif ch == '}' and depth > 0:
+                depth -= 1
+                closed = closed or depth == 0
+        return depth, closed
+    
+    def _extract_json(self, response_text: str) -> Optional[Dict[str, Any]]:
+        """Extract a JSON object from a Claude response, or None if there isn't one"""
+        # Claude usually returns bare JSON, so try that first
+        try:
+            result = orjson.loads(response_text)
+            if isinstance(result, dict):
+                return result
+        except orjson.JSONDecodeError:
+            pass
+        
+        # First balanced object, so trailing prose with braces doesn't leak in
+        buf = response_text.encode('utf-8')
+        start, end = _find_balanced_json(np.frombuffer(buf, dtype=np.uint8))
+        if start != -1:
+            try:
+                result = orjson.loads(buf[start:end])
+                if isinstance(result, dict):
+                    return result
+            except orjson.JSONDecodeError:
+                pass
+        
+        # Fall back to the outermost {...} span
+        match = _JSON_RE.search(response_text)
+        if match:
+            try:
+                result = orjson.loads(match.group(0))
+                if isinstance(result, dict):
+                    return result
+            except orjson.JSONDecodeError:
+                pass
+        return None
+    
+    def _parse_response_text(self, response_text: str) -> Dict[str, Any]:
+        """Extract the JSON payload from a Claude response, falling back to raw text"""
+        result = self._extract_json(response_text)
+        if result is not None:
+            return result
+        
+        if not _JSON_RE.search(response_text):
+            # Fallback: return structured response
+            return {
+                "analysis": response_text,
+                "confidence": 0.8,
+                "timestamp": "N/A"
+            }
+        
+        # If JSON parsing fails, return the raw text analysis
+        return {
+            "analysis": response_text,
+            "confidence": 0.8,
+            "raw_response": True
+        }
+    
+    async def _analyze_one(self, aclient: AsyncAnthropic, sem: asyncio.Semaphore, frame: np.ndarray,
+                           analysis_type: str, i: int) -> AnalysisResult:
+        """Analyze a single image on the async client, retrying on rate limits"""
+        # Encode off the event loop so it overlaps with requests already in flight
+        image_base64 = await asyncio.get_running_loop().run_in_executor(
+            self._executor, self.encode_image, frame, self.MAX_IMAGE_EDGE, analysis_type
+        )
+        
+        async with sem:
+            for attempt in range(self.MAX_RETRIES + 1):
+                try:
+                    message = await aclient.messages.create(
+                        model=self.MODEL,
+                        max_tokens=1000,
+                        messages=self._build_messages(image_base64, analysis_type)
+                    )
+                    break
+                except RateLimitError:
+                    if attempt == self.MAX_RETRIES:
+                        raise
+                    # Exponential backoff: 1s, 2s, 4s, ...
+                    await asyncio.sleep(2 ** attempt)
+        
+        result = self._parse_response_text(message.content[0].text)
+        result["image_index"] = i
+        return result
+    
+    async def abatch_analyze_images(self, images: list, analysis_type: str = "general") -> List[AnalysisResult]:
+        """Analyze multiple images concurrently, bounded by MAX_CONCURRENT_STREAMS"""
+        sem = asyncio.Semaphore(Config.MAX_CONCURRENT_STREAMS)
+        # The async client's connection pool is bound to the running event loop,
+        # and batch_analyze_images starts a new loop per call, so each batch
+        # gets its own client
+        async with AsyncAnthropic(
+            api_key=os.getenv('ANTHROPIC_API_KEY'),
+            timeout=Timeout(Config.AI_PROCESSING_TIMEOUT, connect=5.0)
+        ) as aclient:
+            results = await asyncio.gather(
+                *[self._analyze_one(aclient, sem, image, analysis_type, i) for i, image in enumerate(images)],
+                return_exceptions=True
+            )
+        
+        for i, result in enumerate(results):
+            if isinstance(result, BaseException):
+                print(f"Error in Anthropic analysis: {result}")
+                results[i] = {
+                    "error": str(result),
+                    "analysis": "Analysis failed",
+                    "confidence": 0.0,
+                    "image_index": i
+                }
+        return results
+    
+    def batch_analyze_images(self, images: list, analysis_type: str = "general",
+                             use_batch_api: bool = False) -> List[AnalysisResult]:
+        """Analyze multiple images in batch
+        
+        By default requests are sent concurrently for online use. Set
+        use_batch_api for bulk offline jobs that can wait on the Message
+        Batches API.
+        """
+        if use_batch_api:
+            return self._batch_analyze_offline(images, analysis_type)
+        return asyncio.run(self.abatch_analyze_images(images, analysis_type))
+    
+    def _batch_analyze_offline(self, images: list, analysis_type: str = "general",
+                               poll_interval: float = 5.0) -> List[AnalysisResult]:
+        """Analyze multiple images in one Message Batches API submission"""
+        if not images:
+            return []
+        
+        requests = []
+        for i, image in enumerate(images):
+            requests.append({
+                "custom_id": f"img-{i}",
+                "params": {
+                    "model": self.MODEL,
+                    "max_tokens": 1000,
+                    "messages": self._build_messages(
+                        self.encode_image(image, analysis_type=analysis_type), analysis_type
+                    )
+                }
+            })
+        
+        try:
+            batch = self.client.messages.batches.create(requests=requests)
+            
+            # Wait for the batch to finish processing
+            while batch.processing_status != "ended":
+                time.sleep(poll_interval)
+                batch = self.client.messages.batches.retrieve(batch.id)
+            
+            results = {}
+            for entry in self.client.messages.batches.results(batch.id):
+                index = int(entry.custom_id.rsplit("-", 1)[1])
+                if entry.result.type == "succeeded":
+                    result = self._parse_response_text(entry.result.message.content[0].text)
+                else:
+                    result = {
+                        "error": f"Batch request {entry.result.type}",
+                        "analysis": "Analysis failed",
+                        "confidence": 0.0
+                    }
+                result["image_index"] = index
+                results[index] = result
+        except Exception as e:
+            print(f"Error in Anthropic batch analysis: {e}")
+            results = {}
+        
+        # Requests missing from the batch output are reported as failures
+        return [
+            results.get(i, {
+                "error": "No result returned for image",
+                "analysis": "Analysis failed",
+                "confidence": 0.0,
+                "image_index": i
+            })
+            for i in range(len(images))
+        ]
@@ -1,6 +1,48 @@
 import os
+from dataclasses import dataclass, fields
+from functools import cache, lru_cache
 from pathlib import Path
-from typing import List, Tuple
+from types import MappingProxyType
+from typing import FrozenSet, List, Mapping, Optional, Tuple
+from dotenv import load_dotenv
+
+# Config's class attributes read the environment at import time, so .env must be loaded first
+load_dotenv()
+
+@dataclass(frozen=True)
+class _ConfigSnapshot:
+    """Immutable copy of the resolved Config values"""
+    ANTHROPIC_API_KEY: Optional[str]
+    CLERK_SECRET_KEY: Optional[str]
+    HOST: str
+    PORT: int
+    DEBUG: bool
+    UPLOAD_DIR: Path
+    OUTPUT_DIR: Path
+    LOGS_DIR: Path
+    MAX_FILE_SIZE: str
+    FRAME_SKIP: int
+    MAX_RESULTS: int
+    MAX_CONCURRENT_STREAMS: int
+    AI_CONFIDENCE_THRESHOLD: float
+    ENABLE_ANTHROPIC: bool
+    AI_PROCESSING_TIMEOUT: int
+    USE_FILES_API: bool
+    USE_TURBOJPEG: bool
+    GRAYSCALE_ANALYSIS_TYPES: FrozenSet[str]
+    DEFAULT_FPS: int
+    VIDEO_RESOLUTION: Tuple[int, ...]
+    WEBCAM_TIMEOUT: int
+    RTSP_TIMEOUT: int
+    CORS_ORIGINS: Tuple[str, ...]
+    LOG_LEVEL: str
+    LOG_FORMAT: str
+    ENABLE_FILE_LOGGING: bool
+    THREAD_POOL_SIZE: int
+    INFERENCE_WORKERS: int
+    MEMORY_LIMIT_MB: int
+    ENABLE_RATE_LIMITING: bool
+    MAX_REQUESTS_PER_MINUTE: int
 
 class Config:
     """Enhanced configu            elif len(cls.ANTHROPIC_API_KEY) < 10:
@@ -39,6 +81,12 @@ class Config:
     AI_CONFIDENCE_THRESHOLD = max(0.0, min(1.0, float(os.getenv('AI_CONFIDENCE_THRESHOLD', 0.5))))
     ENABLE_ANTHROPIC = os.getenv('ENABLE_ANTHROPIC', 'true').lower() == 'true'
     AI_PROCESSING_TIMEOUT = int(os.getenv('AI_PROCESSING_TIMEOUT', 30))  # seconds
+    USE_FILES_API = os.getenv('USE_FILES_API', 'false').lower() == 'true'  # Upload frames instead of base64
+    USE_TURBOJPEG = os.getenv('USE_TURBOJPEG', 'false').lower() == 'true'  # Requires PyTurboJPEG
+    # Analysis types whose frames are sent as grayscale, e.g. "defect_analysis"
+    GRAYSCALE_ANALYSIS_TYPES = frozenset(
+        t.strip() for t in os.getenv('GRAYSCALE_ANALYSIS_TYPES', '').split(',') if t.strip()
+    )
     
     # Video Configuration
     DEFAULT_FPS = max(1, int(os.getenv('DEFAULT_FPS', 30)))
@@ -56,12 +104,21 @@ class Config:
     
     # Performance Configuration
     THREAD_POOL_SIZE = int(os.getenv('THREAD_POOL_SIZE', 4))
+    INFERENCE_WORKERS = max(0, int(os.getenv('INFERENCE_WORKERS', 0)))  # 0 = run models in the stream threads
     MEMORY_LIMIT_MB = int(os.getenv('MEMORY_LIMIT_MB', 2048))
     
     # Security Configuration
     ENABLE_RATE_LIMITING = os.getenv('ENABLE_RATE_LIMITING', 'true').lower() == 'true'
     MAX_REQUESTS_PER_MINUTE = int(os.getenv('MAX_REQUESTS_PER_MINUTE', 60))
     
+    @classmethod
+    @cache
+    def snapshot(cls) -> _ConfigSnapshot:
+        """Get a frozen snapshot of the configuration, resolved once"""
+        values = {field.name: getattr(cls, field.name) for field in fields(_ConfigSnapshot)}
+        values["CORS_ORIGINS"] = tuple(values["CORS_ORIGINS"])
+        return _ConfigSnapshot(**values)
+    
     @classmethod
     def create_directories(cls):
         """Create necessary directories with proper permissions"""
@@ -110,14 +167,15 @@ class Config:
     @classmethod
     def _validate_anthropic(cls):
         """Validate Anthropic AI configuration"""
-        if cls.ENABLE_ANTHROPIC:
-            if not cls.ANTHROPIC_API_KEY:
+        snap = cls.snapshot()
+        if snap.ENABLE_ANTHROPIC:
+            if not snap.ANTHROPIC_API_KEY:
                 return {
                     "valid": False,
                     "message": "Anthropic enabled but API key missing",
                     "warnings": ["Add ANTHROPIC_API_KEY to environment variables"]
                 }
-            elif len(cls.ANTHROPIC_API_KEY) < 10:
+            elif len(snap.ANTHROPIC_API_KEY) < 10:
                 return {
                     "valid": False,
                     "message": "Anthropic API key appears invalid",
@@ -137,7 +195,8 @@ class Config:
     @classmethod
     def _validate_clerk(cls):
         """Validate Clerk authentication configuration"""
-        if cls.CLERK_SECRET_KEY:
+        snap = cls.snapshot()
+        if snap.CLERK_SECRET_KEY:
             return {
                 "valid": True,
                 "message": "Clerk authentication configured"
@@ -152,31 +211,33 @@ class Config:
     @classmethod
     def _validate_video_config(cls):
         """Validate video processing configuration"""
+        snap = cls.snapshot()
         warnings = []
         
-        if cls.FRAME_SKIP < 10:
+        if snap.FRAME_SKIP < 10:
             warnings.append("Low FRAME_SKIP may cause high CPU usage")
-        elif cls.FRAME_SKIP > 100:
+        elif snap.FRAME_SKIP > 100:
             warnings.append("High FRAME_SKIP may miss important events")
         
-        if cls.DEFAULT_FPS > 60:
+        if snap.DEFAULT_FPS > 60:
             warnings.append("High FPS may impact performance")
         
-        if cls.VIDEO_RESOLUTION[0] * cls.VIDEO_RESOLUTION[1] > 1920 * 1080:
+        if snap.VIDEO_RESOLUTION[0] * snap.VIDEO_RESOLUTION[1] > 1920 * 1080:
             warnings.append("High resolution may impact performance")
         
         return {
             "valid": True,
-            "message": f"Video config: {cls.VIDEO_RESOLUTION}, {cls.DEFAULT_FPS}fps",
+            "message": f"Video config: {snap.VIDEO_RESOLUTION}, {snap.DEFAULT_FPS}fps",
             "warnings": warnings
         }
     
     @classmethod
     def _validate_directories(cls):
         """Validate directory configuration"""
+        snap = cls.snapshot()
         try:
             # Check if directories exist and are writable
-            for directory in [cls.UPLOAD_DIR, cls.OUTPUT_DIR, cls.LOGS_DIR]:
+            for directory in [snap.UPLOAD_DIR, snap.OUTPUT_DIR, snap.LOGS_DIR]:
                 if not directory.exists():
                     return {
                         "valid": False,
@@ -184,12 +245,9 @@ class Config:
                         "critical": True
                     }
                 
-                # Test write access
-                test_file = directory / ".write_test"
-                try:
-                    test_file.write_text("test")
-                    test_file.unlink()
-                except Exception:
+                # os.access is a single syscall; only fall back to a real write
+                # when it reports no access (it can be wrong on network mounts)
+                if not os.access(directory, os.W_OK) and not cls._can_write(directory):
                     return {
                         "valid": False,
                         "message": f"No write access to: {directory}",
@@ -207,73 +265,93 @@ class Config:
                 "critical": True
             }
     
+    @staticmethod
+    def _can_write(directory: Path) -> bool:
+        """Check write access by creating and removing a test file"""
+        test_file = directory / ".write_test"
+        try:
+            test_file.write_text("test")
+            test_file.unlink()
+            return True
+        except Exception:
+            return False
+    
     @classmethod
     def _validate_performance(cls):
         """Validate performance configuration"""
+        snap = cls.snapshot()
         warnings = []
         
-        if cls.MAX_RESULTS > 10000:
+        if snap.MAX_RESULTS > 10000:
             warnings.append("High MAX_RESULTS may consume excessive memory")
         
-        if cls.MAX_CONCURRENT_STREAMS > 20:
+        if snap.MAX_CONCURRENT_STREAMS > 20:
             warnings.append("High concurrent streams may impact performance")
         
-        if cls.THREAD_POOL_SIZE > 10:
+        if snap.THREAD_POOL_SIZE > 10:
             warnings.append("Large thread pool may cause resource contention")
         
-        if cls.MEMORY_LIMIT_MB < 512:
+        if snap.INFERENCE_WORKERS > (os.cpu_count() or 1):
+            warnings.append("More inference workers than CPU cores")
+        
+        if snap.MEMORY_LIMIT_MB < 512:
             warnings.append("Low memory limit may cause performance issues")
         
         return {
             "valid": True,
-            "message": f"Performance limits: {cls.MAX_CONCURRENT_STREAMS} streams, {cls.MEMORY_LIMIT_MB}MB",
+            "message": f"Performance limits: {snap.MAX_CONCURRENT_STREAMS} streams, {snap.MEMORY_LIMIT_MB}MB",
             "warnings": warnings
         }
     
     @classmethod
-    def get_opencv_config(cls):
-        """Get OpenCV-specific configuration"""
-        return {
+    @lru_cache(maxsize=1)
+    def get_opencv_config(cls) -> Mapping:
+        """Get OpenCV-specific configuration (built once, read-only)"""
+        return MappingProxyType({
             "resolution": cls.VIDEO_RESOLUTION,
             "fps": cls.DEFAULT_FPS,
             "buffer_size": 1,
             "timeout": cls.WEBCAM_TIMEOUT,
             "codec": "MJPG"  # Default codec
-        }
+        })
     
     @classmethod
-    def get_ai_config(cls):
-        """Get AI processing configuration"""
-        return {
+    @lru_cache(maxsize=1)
+    def get_ai_config(cls) -> Mapping:
+        """Get AI processing configuration (built once, read-only)"""
+        return MappingProxyType({
             "confidence_threshold": cls.AI_CONFIDENCE_THRESHOLD,
             "enable_anthropic": cls.ENABLE_ANTHROPIC,
             "processing_timeout": cls.AI_PROCESSING_TIMEOUT,
+            "use_files_api": cls.USE_FILES_API,
             "frame_skip": cls.FRAME_SKIP
-        }
+        })
     
     @classmethod
-    def get_server_config(cls):
-        """Get server configuration"""
-        return {
+    @lru_cache(maxsize=1)
+    def get_server_config(cls) -> Mapping:
+        """Get server configuration (built once, read-only)"""
+        return MappingProxyType({
             "host": cls.HOST,
             "port": cls.PORT,
             "debug": cls.DEBUG,
-            "cors_origins": cls.CORS_ORIGINS,
+            "cors_origins": tuple(cls.CORS_ORIGINS),
             "log_level": cls.LOG_LEVEL
-        }
+        })
     
     @classmethod
     def print_config_summary(cls):
         """Print a summary of current configuration"""
+        snap = cls.snapshot()
         print("\n=== VMS Configuration Summary ===")
-        print(f"Server: {cls.HOST}:{cls.PORT}")
-        print(f"Anthropic AI: {'Enabled' if cls.ENABLE_ANTHROPIC else 'Disabled'}")
-        print(f"Max Streams: {cls.MAX_CONCURRENT_STREAMS}")
-        print(f"Frame Skip: {cls.FRAME_SKIP}")
-        print(f"Max Results: {cls.MAX_RESULTS}")
-        print(f"Video Resolution: {cls.VIDEO_RESOLUTION[0]}x{cls.VIDEO_RESOLUTION[1]}")
-        print(f"Upload Dir: {cls.UPLOAD_DIR}")
-        print(f"Output Dir: {cls.OUTPUT_DIR}")
+        print(f"Server: {snap.HOST}:{snap.PORT}")
+        print(f"Anthropic AI: {'Enabled' if snap.ENABLE_ANTHROPIC else 'Disabled'}")
+        print(f"Max Streams: {snap.MAX_CONCURRENT_STREAMS}")
+        print(f"Frame Skip: {snap.FRAME_SKIP}")
+        print(f"Max Results: {snap.MAX_RESULTS}")
+        print(f"Video Resolution: {snap.VIDEO_RESOLUTION[0]}x{snap.VIDEO_RESOLUTION[1]}")
+        print(f"Upload Dir: {snap.UPLOAD_DIR}")
+        print(f"Output Dir: {snap.OUTPUT_DIR}")
         print("=" * 33)
 
 # Create and validate configuration instance
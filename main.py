@@ -1,17 +1,26 @@
 from fastapi import FastAPI, UploadFile, File, WebSocket, WebSocketDisconnect, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 import asyncio
+from collections import Counter, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import islice
 import cv2
 import numpy as np
 from typing import Dict, List, Optional
-import json
+import orjson
 from datetime import datetime
 import uuid
 import threading
+import zlib
+import multiprocessing
+from multiprocessing import shared_memory
 import base64
 from pydantic import BaseModel
 import os
+import sys
 from pathlib import Path
 from dotenv import load_dotenv
 import time
@@ -27,14 +36,28 @@ logger = logging.getLogger(__name__)
 load_dotenv()
 
 # Import local modules with error handling
+# Model registry lives in its own module so inference workers can import it without the app
+from inference import available_models, forget_stream, infer_in_worker, run_models
+
+try:
+    # Previews share ai_processor's TurboJPEG encoder and its USE_TURBOJPEG gate
+    from ai_processor import _TURBOJPEG as _turbojpeg
+except ImportError:
+    _turbojpeg = None
+
+if _turbojpeg is not None:
+    from turbojpeg import TJPF_BGR
+else:
+    logger.info("TurboJPEG not enabled, frame previews use OpenCV's JPEG encoder")
+
 try:
-    from ai_processor import AnthropicAIProcessor
+    import msgpack
 except ImportError:
-    logger.warning("ai_processor module not found, using mock AI processor")
-    AnthropicAIProcessor = None
+    logger.info("msgpack not available, WebSocket clients always receive JSON")
+    msgpack = None
 
 try:
-    from video_utils import check_video_sources
+    from video_utils import check_video_sources, open_accelerated_capture
 except ImportError:
     logger.warning("video_utils module not found, using basic video source checking")
     def check_video_sources():
@@ -42,6 +65,9 @@ except ImportError:
             "webcam": True,  # Assume webcam is available
             "sample_video": None
         }
+    
+    def open_accelerated_capture(source):
+        return cv2.VideoCapture(source)
 
 try:
     from config import Config
@@ -53,6 +79,8 @@ except ImportError:
         PORT = 8000
         FRAME_SKIP = 30
         MAX_RESULTS = 1000
+        DEFAULT_FPS = 30
+        INFERENCE_WORKERS = 0
         ENABLE_ANTHROPIC = False
         ANTHROPIC_API_KEY = None
         
@@ -70,7 +98,7 @@ config = Config()
 config.create_directories()
 config.validate_config()
 
-app = FastAPI(title="Video Management System", version="1.0.0")
+app = FastAPI(title="Video Management System", version="1.0.0", default_response_class=ORJSONResponse)
 
 # CORS middleware
 app.add_middleware(
@@ -89,110 +117,91 @@ class StreamConfig(BaseModel):
     ai_models: List[str]
     is_active: bool = False
 
-class AIResult(BaseModel):
+@dataclass
+class AIResultRecord:
+    """Stored AI result; a plain dataclass keeps validation off the per-frame path"""
+    __slots__ = ("stream_id", "model_name", "timestamp", "results", "confidence", "alert_level")
+    
     stream_id: str
     model_name: str
-    timestamp: datetime
+    timestamp: str  # ISO 8601, formatted once when the result is created
     results: dict
     confidence: float
     alert_level: str  # 'info', 'warning', 'critical'
 
 # Global variables with thread locks
 streams: Dict[str, dict] = {}
-ai_results: List[AIResult] = []
-connected_clients: List[WebSocket] = []
-results_lock = threading.Lock()
-clients_lock = threading.Lock()
+ai_results: deque = deque(maxlen=config.MAX_RESULTS)
+connected_clients: Dict[WebSocket, str] = {}  # client -> wire format ("json" or "msgpack")
+results_lock = threading.Lock()  # ai_results is written from the capture threads
+clients_lock = asyncio.Lock()  # connected_clients is only touched on the event loop
+# Rolling windows behind /dashboard/stats, updated as results are stored
+RECENT_RESULTS_WINDOW = 60.0
+RECENT_ALERTS_WINDOW = 300.0
+recent_result_times: deque = deque(maxlen=config.MAX_RESULTS)
+recent_alerts: deque = deque()  # (monotonic time, alert level)
+alert_counts: Counter = Counter()
+# Server event loop, captured at startup so capture threads can schedule broadcasts
+MAIN_LOOP: Optional[asyncio.AbstractEventLoop] = None
+# Results waiting for the broadcaster task; both are created at startup
+BROADCAST_QUEUE: Optional[asyncio.Queue] = None
+BROADCAST_TASK: Optional[asyncio.Task] = None
+BROADCAST_QUEUE_SIZE = 1000
+BROADCAST_BATCH_SIZE = 128  # Max results coalesced into one WebSocket frame
+# Single-process inference executors, created at startup when INFERENCE_WORKERS > 0;
+# each stream is pinned to one so its result cache and scene state stay in one worker
+INFER_POOLS: List[ProcessPoolExecutor] = []
+
+def _infer_pool_for(stream_id: str) -> ProcessPoolExecutor:
+    """Pick the stream's inference executor; crc32 is stable across restarts, unlike hash()"""
+    return INFER_POOLS[zlib.crc32(stream_id.encode()) % len(INFER_POOLS)]
+
+PREVIEW_JPEG_QUALITY = 70
+
+def encode_preview(frame: np.ndarray) -> bytes:
+    """Encode a BGR frame as a preview JPEG, using libjpeg-turbo when enabled"""
+    if _turbojpeg is not None:
+        return _turbojpeg.encode(frame, quality=PREVIEW_JPEG_QUALITY, pixel_format=TJPF_BGR)
+    
+    ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, PREVIEW_JPEG_QUALITY])
+    if not ok:
+        raise ValueError("Failed to encode preview frame")
+    return buffer.tobytes()
+
+def _record_result_stats(result: AIResultRecord) -> None:
+    """Push a stored result onto the dashboard windows; call with results_lock held"""
+    now = time.monotonic()
+    recent_result_times.append(now)
+    if result.alert_level in ("warning", "critical"):
+        if len(recent_alerts) == config.MAX_RESULTS:
+            _, level = recent_alerts.popleft()
+            alert_counts[level] -= 1
+        recent_alerts.append((now, result.alert_level))
+        alert_counts[result.alert_level] += 1
+
+def _expire_result_stats(now: float) -> None:
+    """Drop entries older than the dashboard windows; call with results_lock held"""
+    cutoff = now - RECENT_RESULTS_WINDOW
+    while recent_result_times and recent_result_times[0] < cutoff:
+        recent_result_times.popleft()
+    cutoff = now - RECENT_ALERTS_WINDOW
+    while recent_alerts and recent_alerts[0][0] < cutoff:
+        _, level = recent_alerts.popleft()
+        alert_counts[level] -= 1
 
 # Create directories
 os.makedirs("uploads", exist_ok=True)
 os.makedirs("outputs", exist_ok=True)
 
-# AI Models
-class AIModel:
-    def __init__(self, name: str):
-        self.name = name
-        self.anthropic_processor = None
-        
-        # Initialize Anthropic processor if available
-        if AnthropicAIProcessor and config.ENABLE_ANTHROPIC and config.ANTHROPIC_API_KEY:
-            try:
-                self.anthropic_processor = AnthropicAIProcessor()
-            except Exception as e:
-                logger.error(f"Failed to initialize Anthropic processor: {e}")
-                self.anthropic_processor = None
-    
-    def process_frame(self, frame: np.ndarray) -> dict:
-        """AI processing using Anthropic Claude Vision or mock data"""
-        try:
-            height, width = frame.shape[:2]
-            
-            # Use Anthropic AI if available
-            if self.anthropic_processor:
-                try:
-                    analysis_type = {
-                        "object_detection": "object_detection",
-                        "defect_analysis": "defect_analysis", 
-                        "asset_tracking": "asset_tracking"
-                    }.get(self.name, "general")
-                    
-                    return self.anthropic_processor.analyze_frame(frame, analysis_type)
-                except Exception as e:
-                    logger.error(f"Anthropic API error, falling back to mock data: {e}")
-            
-            # Mock AI processing as fallback
-            return self._get_mock_result(width, height)
-        except Exception as e:
-            logger.error(f"Error in AI processing: {e}")
-            return {"error": str(e), "processed": False}
-    
-    def _get_mock_result(self, width: int, height: int) -> dict:
-        """Generate mock AI results based on model type"""
-        if self.name == "object_detection":
-            return {
-                "objects": [
-                    {"class": "person", "confidence": 0.85, "bbox": [100, 100, 200, 300], "location": "center"},
-                    {"class": "car", "confidence": 0.72, "bbox": [300, 150, 500, 400], "location": "right"}
-                ],
-                "count": 2,
-                "frame_size": f"{width}x{height}",
-                "analysis_type": "object_detection"
-            }
-        elif self.name == "defect_analysis":
-            return {
-                "defects": [
-                    {"type": "scratch", "severity": "minor", "location": [150, 200], "confidence": 0.78}
-                ],
-                "defect_count": 1,
-                "quality_score": 0.88,
-                "frame_size": f"{width}x{height}",
-                "analysis_type": "defect_analysis"
-            }
-        elif self.name == "asset_tracking":
-            return {
-                "assets": [
-                    {"id": "asset_001", "type": "equipment", "status": "operational", "location": "zone_a"}
-                ],
-                "total_assets": 1,
-                "frame_size": f"{width}x{height}",
-                "analysis_type": "asset_tracking"
-            }
-        else:
-            return {
-                "processed": True, 
-                "frame_size": f"{width}x{height}",
-                "analysis_type": "general",
-                "timestamp": datetime.now().isoformat()
-            }
-
-# Available AI models
-available_models = {
-    "object_detection": AIModel("object_detection"),
-    "defect_analysis": AIModel("defect_analysis"),
-    "asset_tracking": AIModel("asset_tracking")
-}
+# Defect severity ranks and the alert level each maps to
+_SEVERITY_RANK = {"minor": 1, "moderate": 2, "severe": 3}
+_SEVERE = _SEVERITY_RANK["severe"]
+_DEFECT_ALERT_LEVELS = ("warning", "warning", "warning", "critical")
 
 class VideoProcessor:
+    # Minimum seconds between two frames sent to the same model
+    MODEL_INTERVAL = 1.0
+    
     def __init__(self, stream_id: str, stream_config: StreamConfig):
         self.stream_id = stream_id
         self.config = stream_config
@@ -200,7 +209,9 @@ class VideoProcessor:
         self.is_running = False
         self.thread = None
         self.frame_count = 0
-        self.last_process_time = 0
+        self.last_process_time: Dict[str, float] = {}  # model name -> monotonic time of last run
+        self.latest_frame: Optional[np.ndarray] = None
+        self._pending_inference: Optional[Future] = None
         
     def start(self):
         """Start video processing"""
@@ -222,9 +233,8 @@ class VideoProcessor:
         logger.info(f"Stopping stream {self.stream_id}")
         self.is_running = False
         
-        if self.cap:
-            self.cap.release()
-            
+        # The capture thread releases self.cap in _cleanup(); releasing it here
+        # would race with a grab() in progress on that thread
         if self.thread and self.thread.is_alive():
             self.thread.join(timeout=2)
             
@@ -238,9 +248,22 @@ class VideoProcessor:
                 
             logger.info(f"Processing video for stream {self.stream_id}")
             
+            # Pace playback to the source's own frame rate
+            source_fps = self.cap.get(cv2.CAP_PROP_FPS)
+            frame_interval = 1.0 / (source_fps if source_fps > 0 else config.DEFAULT_FPS)
+            next_deadline = time.monotonic()
+            
+            # Hot-loop state kept in locals; a countdown to the next processed
+            # frame replaces a modulo on every grabbed frame
+            frame_skip = config.FRAME_SKIP
+            frame_count = self.frame_count
+            until_processed = -frame_count % frame_skip
+            
             while self.is_running:
                 try:
-                    ret, frame = self.cap.read()
+                    # grab() only advances the stream; the decode and color
+                    # conversion happen in retrieve(), for processed frames only
+                    ret = self.cap.grab()
                     if not ret:
                         if self.config.source == "file":
                             # Restart file playback
@@ -251,17 +274,31 @@ class VideoProcessor:
                             break
                     
                     # Process every Nth frame to reduce load
-                    if self.frame_count % config.FRAME_SKIP == 0:
-                        self._process_frame_async(frame)
+                    if until_processed == 0:
+                        until_processed = frame_skip
+                        self.frame_count = frame_count  # Publish progress for /streams
+                        ret, frame = self.cap.retrieve()
+                        if ret:
+                            self.latest_frame = frame
+                            self._process_frame_async(frame)
                         
-                    self.frame_count += 1
-                    
-                    # Limit FPS to prevent overwhelming the system
-                    time.sleep(0.033)  # ~30 FPS
+                        # Sleep only on processed frames, catching up to the source rate
+                        now = time.monotonic()
+                        if next_deadline > now:
+                            time.sleep(next_deadline - now)
+                        elif now - next_deadline > frame_interval:
+                            # Fell behind (e.g. slow AI call): don't burst to catch up
+                            next_deadline = now
+                        
+                    until_processed -= 1
+                    frame_count += 1
+                    next_deadline += frame_interval
                     
                 except Exception as e:
                     logger.error(f"Error processing frame in stream {self.stream_id}: {e}")
                     time.sleep(1)  # Wait before retrying
+            
+            self.frame_count = frame_count
                     
         except Exception as e:
             logger.error(f"Fatal error in video processing for stream {self.stream_id}: {e}")
@@ -274,12 +311,12 @@ class VideoProcessor:
             if self.config.source == "webcam":
                 self.cap = cv2.VideoCapture(int(self.config.source_path))
             elif self.config.source == "rtsp":
-                self.cap = cv2.VideoCapture(self.config.source_path)
+                self.cap = open_accelerated_capture(self.config.source_path)
             elif self.config.source == "file":
                 if not os.path.exists(self.config.source_path):
                     logger.error(f"Video file not found: {self.config.source_path}")
                     return False
-                self.cap = cv2.VideoCapture(self.config.source_path)
+                self.cap = open_accelerated_capture(self.config.source_path)
             else:
                 logger.error(f"Unknown source type: {self.config.source}")
                 return False
@@ -305,43 +342,92 @@ class VideoProcessor:
             
     def _process_frame_async(self, frame: np.ndarray):
         """Process frame with AI models"""
-        # Limit processing frequency
-        current_time = time.time()
-        if current_time - self.last_process_time < 1.0:  # Process at most once per second
+        # Limit each model to one frame per MODEL_INTERVAL, paced independently
+        now = time.monotonic()
+        model_names = [
+            name for name in self.config.ai_models
+            if name in available_models
+            and now - self.last_process_time.get(name, float("-inf")) >= self.MODEL_INTERVAL
+        ]
+        if not model_names:
             return
-        self.last_process_time = current_time
         
-        for model_name in self.config.ai_models:
-            if model_name in available_models:
-                try:
-                    model = available_models[model_name]
-                    results = model.process_frame(frame)
-                    
-                    # Create AI result
-                    ai_result = AIResult(
-                        stream_id=self.stream_id,
-                        model_name=model_name,
-                        timestamp=datetime.now(),
-                        results=results,
-                        confidence=results.get('confidence', random.uniform(0.7, 0.95)),
-                        alert_level=self._determine_alert_level(results)
-                    )
-                    
-                    # Store result with thread safety
-                    with results_lock:
-                        ai_results.append(ai_result)
-                        # Keep only configured number of results
-                        if len(ai_results) > config.MAX_RESULTS:
-                            ai_results.pop(0)
-                    
-                    # Schedule broadcast in the event loop
-                    asyncio.run_coroutine_threadsafe(
-                        self._broadcast_result(ai_result),
-                        asyncio.get_event_loop()
-                    )
-                    
-                except Exception as e:
-                    logger.error(f"Error processing frame with {model_name}: {e}")
+        if INFER_POOLS:
+            if self._submit_inference(frame, model_names):
+                for model_name in model_names:
+                    self.last_process_time[model_name] = now
+            return
+        
+        for model_name in model_names:
+            self.last_process_time[model_name] = now
+        try:
+            results_by_model = run_models(frame, model_names, self.stream_id)
+        except Exception as e:
+            logger.error(f"Error processing frame from stream {self.stream_id}: {e}")
+            return
+        
+        for model_name, results in results_by_model.items():
+            try:
+                self._publish_result(model_name, results)
+            except Exception as e:
+                logger.error(f"Error processing frame with {model_name}: {e}")
+    
+    def _submit_inference(self, frame: np.ndarray, model_names: List[str]) -> bool:
+        """Stage the frame in shared memory and run the models in the stream's inference worker"""
+        if self._pending_inference is not None and not self._pending_inference.done():
+            return False  # Previous frame still in flight; drop this one
+        
+        shm = shared_memory.SharedMemory(create=True, size=frame.nbytes)
+        np.copyto(np.ndarray(frame.shape, dtype=frame.dtype, buffer=shm.buf), frame)
+        try:
+            future = _infer_pool_for(self.stream_id).submit(
+                infer_in_worker, shm.name, frame.shape, frame.dtype.str, model_names, self.stream_id
+            )
+        except Exception as e:
+            shm.close()
+            shm.unlink()
+            logger.error(f"Error submitting frame from stream {self.stream_id} for inference: {e}")
+            return False
+        
+        future.add_done_callback(lambda f: self._on_inference_done(f, shm))
+        self._pending_inference = future
+        return True
+    
+    def _on_inference_done(self, future: Future, shm: shared_memory.SharedMemory):
+        """Release the staged frame and publish the worker's results"""
+        shm.close()
+        shm.unlink()
+        try:
+            results_by_model = future.result()
+        except Exception as e:
+            logger.error(f"Inference failed for stream {self.stream_id}: {e}")
+            return
+        
+        for model_name, results in results_by_model.items():
+            try:
+                self._publish_result(model_name, results)
+            except Exception as e:
+                logger.error(f"Error publishing {model_name} result: {e}")
+    
+    def _publish_result(self, model_name: str, results: dict):
+        """Store a model result and schedule its broadcast"""
+        ai_result = AIResultRecord(
+            stream_id=self.stream_id,
+            model_name=model_name,
+            timestamp=datetime.now().isoformat(),
+            results=results,
+            confidence=results['confidence'] if 'confidence' in results else 0.7 + random.random() * 0.25,
+            alert_level=self._determine_alert_level(results)
+        )
+        
+        # Store result with thread safety; maxlen evicts the oldest
+        with results_lock:
+            ai_results.append(ai_result)
+            _record_result_stats(ai_result)
+        
+        # Schedule broadcast in the event loop (late worker results may land after shutdown)
+        if MAIN_LOOP is not None and not MAIN_LOOP.is_closed():
+            MAIN_LOOP.call_soon_threadsafe(_enqueue_broadcast, ai_result)
                     
     def _determine_alert_level(self, results: dict) -> str:
         """Determine alert level based on results"""
@@ -353,13 +439,13 @@ class VideoProcessor:
             if "defects" in results:
                 defects = results["defects"]
                 if isinstance(defects, list) and len(defects) > 0:
-                    severe_defects = [d for d in defects if d.get("severity") == "severe"]
-                    if severe_defects:
-                        return "critical"
-                    moderate_defects = [d for d in defects if d.get("severity") == "moderate"]
-                    if moderate_defects:
-                        return "warning"
-                    return "warning"
+                    # Single pass for the worst severity; any defect is at least a warning
+                    max_severity = 0
+                    for defect in defects:
+                        max_severity = max(max_severity, _SEVERITY_RANK.get(defect.get("severity"), 0))
+                        if max_severity == _SEVERE:
+                            break
+                    return _DEFECT_ALERT_LEVELS[max_severity]
             
             # Check for high object count
             if "objects" in results:
@@ -387,36 +473,77 @@ class VideoProcessor:
         except Exception as e:
             logger.error(f"Error determining alert level: {e}")
             return "info"
-            
-    async def _broadcast_result(self, result: AIResult):
-        """Broadcast result to connected WebSocket clients"""
+
+# Result broadcasting: capture threads hand results to the event loop, where a
+# single broadcaster task coalesces bursts into one message per client
+def _enqueue_broadcast(result: AIResultRecord):
+    """Queue a result for the broadcaster (runs on the event loop); drops the oldest when full"""
+    if BROADCAST_QUEUE.full():
+        BROADCAST_QUEUE.get_nowait()
+    BROADCAST_QUEUE.put_nowait(result)
+
+async def _broadcaster():
+    """Send queued results to WebSocket clients, batching whatever has accumulated"""
+    while True:
+        batch = [await BROADCAST_QUEUE.get()]
+        while len(batch) < BROADCAST_BATCH_SIZE and not BROADCAST_QUEUE.empty():
+            batch.append(BROADCAST_QUEUE.get_nowait())
+        
         if not connected_clients:
-            return
-            
-        message = {
-            "type": "ai_result",
-            "data": {
-                "stream_id": result.stream_id,
-                "model_name": result.model_name,
-                "timestamp": result.timestamp.isoformat(),
-                "results": result.results,
-                "confidence": result.confidence,
-                "alert_level": result.alert_level
-            }
-        }
+            continue
         
-        with clients_lock:
-            clients_to_remove = []
-            for client in connected_clients:
-                try:
-                    await client.send_text(json.dumps(message))
-                except Exception as e:
-                    logger.warning(f"Failed to send message to client: {e}")
-                    clients_to_remove.append(client)
-            
-            # Remove disconnected clients
-            for client in clients_to_remove:
-                connected_clients.remove(client)
+        if len(batch) == 1:
+            message = {"type": "ai_result", "data": batch[0]}
+        else:
+            message = {"type": "ai_result_batch", "data": batch}
+        
+        try:
+            await _send_to_clients(message)
+        except Exception as e:
+            logger.error(f"Error broadcasting results: {e}")
+
+def _record_fields(obj):
+    """msgpack fallback encoder for AIResultRecord"""
+    if isinstance(obj, AIResultRecord):
+        return {name: getattr(obj, name) for name in AIResultRecord.__slots__}
+    raise TypeError(f"Cannot serialize {type(obj).__name__}")
+
+def _serialize_message(message: dict, wire_format: str) -> bytes:
+    """Encode a broadcast message in one client wire format"""
+    if wire_format == "msgpack":
+        return msgpack.packb(message, default=_record_fields)
+    # orjson handles the record dataclasses natively
+    return orjson.dumps(message)
+
+async def _send_to_clients(message: dict):
+    """Send a message to every connected client concurrently, dropping the ones that fail"""
+    # Snapshot the client list so the lock isn't held across network sends
+    async with clients_lock:
+        clients = list(connected_clients.items())
+    
+    # Serialize once per wire format in use, not once per client
+    payloads = {}
+    for _, wire_format in clients:
+        if wire_format not in payloads:
+            payloads[wire_format] = _serialize_message(message, wire_format)
+    
+    sent = await asyncio.gather(*(_safe_send(client, payloads[wire_format]) for client, wire_format in clients))
+    
+    # Remove disconnected clients
+    failed = [client for (client, _), ok in zip(clients, sent) if not ok]
+    if failed:
+        async with clients_lock:
+            for client in failed:
+                connected_clients.pop(client, None)
+
+async def _safe_send(client: WebSocket, payload: bytes) -> bool:
+    """Send to one client, reporting failure instead of raising"""
+    try:
+        await asyncio.wait_for(client.send_bytes(payload), timeout=5.0)
+        return True
+    except Exception as e:
+        logger.warning(f"Failed to send message to client: {e}")
+        return False
 
 # API Routes
 @app.get("/")
@@ -427,7 +554,7 @@ async def root():
 async def health_check():
     return {"status": "healthy", "timestamp": datetime.now().isoformat()}
 
-@app.get("/streams")
+@app.get("/streams", response_model=None)
 async def get_streams():
     """Get all streams with their current status"""
     stream_list = []
@@ -449,7 +576,7 @@ async def get_streams():
         except Exception as e:
             logger.error(f"Error getting stream info for {stream_id}: {e}")
             
-    return {"streams": stream_list, "total": len(stream_list)}
+    return ORJSONResponse({"streams": stream_list, "total": len(stream_list)})
 
 @app.post("/streams")
 async def create_stream(config: StreamConfig):
@@ -503,6 +630,23 @@ async def start_stream(stream_id: str):
         logger.error(f"Error starting stream {stream_id}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/streams/{stream_id}/preview")
+async def get_stream_preview(stream_id: str):
+    """Get the most recently processed frame of a stream as a JPEG"""
+    if stream_id not in streams:
+        raise HTTPException(status_code=404, detail="Stream not found")
+    
+    frame = streams[stream_id]["processor"].latest_frame
+    if frame is None:
+        raise HTTPException(status_code=404, detail="No frame available yet")
+    
+    try:
+        jpeg = await asyncio.to_thread(encode_preview, frame)
+        return Response(content=jpeg, media_type="image/jpeg")
+    except Exception as e:
+        logger.error(f"Error encoding preview for stream {stream_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/streams/{stream_id}/stop")
 async def stop_stream(stream_id: str):
     """Stop a stream"""
@@ -532,6 +676,12 @@ async def delete_stream(stream_id: str):
         processor.stop()
         del streams[stream_id]
         
+        # Drop per-stream cached results and scene state, held by the stream's worker when pooled
+        if INFER_POOLS:
+            _infer_pool_for(stream_id).submit(forget_stream, stream_id)
+        else:
+            forget_stream(stream_id)
+        
         logger.info(f"Deleted stream: {stream_id}")
         return {"message": "Stream deleted", "stream_id": stream_id}
     except Exception as e:
@@ -551,47 +701,35 @@ async def get_ai_models():
     
     return {"models": models_info, "total": len(available_models)}
 
-@app.get("/results")
+@app.get("/results", response_model=None)
 async def get_results(stream_id: Optional[str] = None, limit: int = 100, alert_level: Optional[str] = None):
     """Get AI results with filtering options"""
     try:
+        # Walk newest-first and stop at `limit` matches instead of copying every result
         with results_lock:
-            filtered_results = ai_results.copy()
-        
-        # Filter by stream_id
-        if stream_id:
-            filtered_results = [r for r in filtered_results if r.stream_id == stream_id]
-        
-        # Filter by alert level
-        if alert_level:
-            filtered_results = [r for r in filtered_results if r.alert_level == alert_level]
-            
-        # Convert to dict for JSON serialization
-        results_data = []
-        for result in filtered_results[-limit:]:
-            results_data.append({
-                "stream_id": result.stream_id,
-                "model_name": result.model_name,
-                "timestamp": result.timestamp.isoformat(),
-                "results": result.results,
-                "confidence": result.confidence,
-                "alert_level": result.alert_level
-            })
+            matching = (
+                r for r in reversed(ai_results)
+                if (not stream_id or r.stream_id == stream_id)
+                and (not alert_level or r.alert_level == alert_level)
+            )
+            filtered_results = list(islice(matching, max(limit, 0)))
+        filtered_results.reverse()
             
-        return {
-            "results": results_data,
-            "total": len(results_data),
+        # orjson serializes the records (dataclasses) directly; no per-row dict needed
+        return ORJSONResponse({
+            "results": filtered_results,
+            "total": len(filtered_results),
             "filters": {
                 "stream_id": stream_id,
                 "alert_level": alert_level,
                 "limit": limit
             }
-        }
+        })
     except Exception as e:
         logger.error(f"Error getting results: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/dashboard/stats")
+@app.get("/dashboard/stats", response_model=None)
 async def get_dashboard_stats():
     """Get dashboard statistics"""
     try:
@@ -599,21 +737,16 @@ async def get_dashboard_stats():
         total_streams = len(streams)
         
         with results_lock:
-            # Results in the last minute
-            recent_results = len([r for r in ai_results if (datetime.now() - r.timestamp).seconds < 60])
-            # Alerts in the last 5 minutes
-            recent_alerts = [r for r in ai_results if 
-                           r.alert_level in ["warning", "critical"] and 
-                           (datetime.now() - r.timestamp).seconds < 300]
+            _expire_result_stats(time.monotonic())
+            # Results in the last minute, alerts in the last 5 minutes
+            recent_results = len(recent_result_times)
             alerts = len(recent_alerts)
-            
-            # Alert breakdown
             alert_breakdown = {
-                "critical": len([r for r in recent_alerts if r.alert_level == "critical"]),
-                "warning": len([r for r in recent_alerts if r.alert_level == "warning"])
+                "critical": alert_counts["critical"],
+                "warning": alert_counts["warning"]
             }
         
-        return {
+        return ORJSONResponse({
             "active_streams": active_streams,
             "total_streams": total_streams,
             "recent_results": recent_results,
@@ -621,18 +754,19 @@ async def get_dashboard_stats():
             "alert_breakdown": alert_breakdown,
             "uptime": "Running",
             "timestamp": datetime.now().isoformat()
-        }
+        })
     except Exception as e:
         logger.error(f"Error getting dashboard stats: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    """WebSocket endpoint for real-time updates"""
+async def websocket_endpoint(websocket: WebSocket, format: str = "json"):
+    """WebSocket endpoint for real-time updates; connect with ?format=msgpack for msgpack frames"""
     await websocket.accept()
     
-    with clients_lock:
-        connected_clients.append(websocket)
+    wire_format = "msgpack" if format == "msgpack" and msgpack is not None else "json"
+    async with clients_lock:
+        connected_clients[websocket] = wire_format
     
     logger.info(f"New WebSocket connection. Total clients: {len(connected_clients)}")
     
@@ -651,15 +785,26 @@ async def websocket_endpoint(websocket: WebSocket):
     except WebSocketDisconnect:
         logger.info("WebSocket disconnected")
     finally:
-        with clients_lock:
-            if websocket in connected_clients:
-                connected_clients.remove(websocket)
+        async with clients_lock:
+            connected_clients.pop(websocket, None)
         logger.info(f"WebSocket connection closed. Remaining clients: {len(connected_clients)}")
 
 # Startup event
 @app.on_event("startup")
 async def startup_event():
     """Create sample streams on startup"""
+    global MAIN_LOOP, INFER_POOLS, BROADCAST_QUEUE, BROADCAST_TASK
+    BROADCAST_QUEUE = asyncio.Queue(maxsize=BROADCAST_QUEUE_SIZE)
+    BROADCAST_TASK = asyncio.create_task(_broadcaster())
+    MAIN_LOOP = asyncio.get_running_loop()
+    if config.INFERENCE_WORKERS > 0:
+        # spawn, not fork: workers must not inherit the server's threads and sockets
+        mp_context = multiprocessing.get_context("spawn")
+        INFER_POOLS = [
+            ProcessPoolExecutor(max_workers=1, mp_context=mp_context)
+            for _ in range(config.INFERENCE_WORKERS)
+        ]
+        logger.info(f"Running AI inference in {config.INFERENCE_WORKERS} worker processes")
     logger.info("Starting Video Management System...")
     
     try:
@@ -733,8 +878,23 @@ async def shutdown_event():
         except Exception as e:
             logger.error(f"Error stopping stream {stream_id}: {e}")
     
+    for pool in INFER_POOLS:
+        pool.shutdown(wait=False, cancel_futures=True)
+    
+    if BROADCAST_TASK is not None:
+        BROADCAST_TASK.cancel()
+    
     logger.info("VMS shutdown complete.")
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host=config.HOST, port=config.PORT, log_level="info")
\ No newline at end of file
+    # uvloop has no Windows build; fall back to the stdlib loop there
+    uvicorn.run(
+        app,
+        host=config.HOST,
+        port=config.PORT,
+        log_level="info",
+        loop="uvloop" if sys.platform != "win32" else "asyncio",
+        http="httptools",
+        ws="websockets",
+    )
\ No newline at end of file
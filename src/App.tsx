@@ -31,6 +31,9 @@ function App() {
   // WebSocket connection for real-time updates
   useEffect(() => {
     const ws = new WebSocket('ws://localhost:8000/ws');
+    // AI results arrive as binary frames of UTF-8 JSON
+    ws.binaryType = 'arraybuffer';
+    const decoder = new TextDecoder();
     
     ws.onopen = () => {
       console.log('WebSocket connected');
@@ -39,9 +42,12 @@ function App() {
     
     ws.onmessage = (event) => {
       try {
-        const message = JSON.parse(event.data);
+        const text = typeof event.data === 'string' ? event.data : decoder.decode(event.data);
+        const message = JSON.parse(text);
         if (message.type === 'ai_result') {
           setResults(prev => [...prev.slice(-99), message.data]);
+        } else if (message.type === 'ai_result_batch') {
+          setResults(prev => [...prev, ...message.data].slice(-100));
         }
       } catch (error) {
         console.error('Error parsing WebSocket message:', error);
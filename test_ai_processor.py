@@ -0,0 +1,108 @@
+"""
+Checks for the frame encoding and parsing helpers in ai_processor
+"""
+
+import numpy as np
+import pytest
+
+import ai_processor
+from ai_processor import AnthropicAIProcessor
+from config import Config
+
+@pytest.fixture
+def processor():
+    processor = AnthropicAIProcessor()
+    yield processor
+    processor.close()
+
+def test_turbojpeg_gray_frames_use_gray_subsampling(processor, monkeypatch):
+    """Single-channel frames must be encoded with TJSAMP_GRAY"""
+    turbojpeg = pytest.importorskip("turbojpeg")
+    calls = []
+
+    class RecordingEncoder:
+        def encode(self, image, quality=85, pixel_format=turbojpeg.TJPF_BGR,
+                   jpeg_subsample=turbojpeg.TJSAMP_422):
+            calls.append((image.ndim, pixel_format, jpeg_subsample))
+            # Mirrors libjpeg-turbo: gray input can't be converted to YCbCr
+            if pixel_format == turbojpeg.TJPF_GRAY and jpeg_subsample != turbojpeg.TJSAMP_GRAY:
+                raise OSError("Unsupported color conversion request")
+            return b"jpeg"
+
+    monkeypatch.setattr(ai_processor, "_TURBOJPEG", RecordingEncoder())
+    for name in ("TJPF_BGR", "TJPF_GRAY", "TJSAMP_GRAY"):
+        monkeypatch.setattr(ai_processor, name, getattr(turbojpeg, name), raising=False)
+    monkeypatch.setattr(Config, "GRAYSCALE_ANALYSIS_TYPES", frozenset({"defect_analysis"}))
+
+    frame = np.random.randint(0, 256, (48, 64, 3), dtype=np.uint8)
+    assert processor.encode_jpeg(frame, analysis_type="defect_analysis") == b"jpeg"
+    assert processor.encode_jpeg(frame, analysis_type="object_detection") == b"jpeg"
+    assert calls == [
+        (2, turbojpeg.TJPF_GRAY, turbojpeg.TJSAMP_GRAY),
+        (3, turbojpeg.TJPF_BGR, turbojpeg.TJSAMP_422),
+    ]
+
+def test_turbojpeg_encodes_gray_frames(processor, monkeypatch):
+    """A real libjpeg-turbo encode of a gray frame decodes back to one channel"""
+    turbojpeg = pytest.importorskip("turbojpeg")
+    try:
+        encoder = turbojpeg.TurboJPEG()
+    except (OSError, RuntimeError) as e:  # RuntimeError from PyTurboJPEG 2.x
+        pytest.skip(f"libturbojpeg not available: {e}")
+
+    monkeypatch.setattr(ai_processor, "_TURBOJPEG", encoder)
+    for name in ("TJPF_BGR", "TJPF_GRAY", "TJSAMP_GRAY"):
+        monkeypatch.setattr(ai_processor, name, getattr(turbojpeg, name), raising=False)
+    monkeypatch.setattr(Config, "GRAYSCALE_ANALYSIS_TYPES", frozenset({"defect_analysis"}))
+
+    frame = np.random.randint(0, 256, (48, 64, 3), dtype=np.uint8)
+    jpeg_bytes = processor.encode_jpeg(frame, analysis_type="defect_analysis")
+    decoded = encoder.decode(jpeg_bytes, pixel_format=turbojpeg.TJPF_GRAY)
+    assert decoded.shape[:2] == (48, 64)
+
+def test_near_duplicate_cache_is_per_stream(processor):
+    """A similar-looking frame from another stream must not reuse a result"""
+    prompt_key = ("object_detection", None)
+    processor._cache_put(0b1011, ("camera_a", prompt_key), {"analysis": "camera a"})
+
+    # One bit away: a near-duplicate for the same stream only
+    assert processor._cache_get(0b1010, ("camera_a", prompt_key))["analysis"] == "camera a"
+    assert processor._cache_get(0b1010, ("camera_b", prompt_key)) is None
+
+    processor.forget_stream("camera_a")
+    assert processor._cache_get(0b1011, ("camera_a", prompt_key)) is None
+
+requires_numba = pytest.mark.skipif(not hasattr(ai_processor, "_phash64_jit"), reason="numba not installed")
+
+@requires_numba
+@pytest.mark.parametrize("text", [
+    b'{"a": 1}',
+    b'Result: {"a": {"b": [1, 2]}} then {"c": 3}',
+    b'{"a": {"b": 1}',                     # never closed
+    b'}} {"a": 1} }',                      # stray closers around the object
+    b'{"text": "a } inside"} trailing }',  # closing brace inside a string
+    b'{"text": "{ open"}}',                # opening brace inside a string
+    b'no braces here',
+    b'',
+])
+def test_find_balanced_json_jit_matches_numpy(text):
+    """The numba scanner must return the same span as the numpy fallback"""
+    buf = np.frombuffer(text, dtype=np.uint8)
+    start, end = ai_processor._find_balanced_json_jit(buf)
+    assert (int(start), int(end)) == ai_processor._find_balanced_json_py(buf)
+
+@requires_numba
+@pytest.mark.parametrize("shape", [(48, 64), (48, 64, 3)], ids=["gray", "bgr"])
+def test_phash64_jit_matches_numpy(processor, monkeypatch, shape):
+    """The numba hash must match the numpy fallback for gray and BGR frames"""
+    noise = np.random.default_rng(0).integers(0, 256, shape, dtype=np.uint8)
+    frames = [
+        noise,
+        np.sort(noise, axis=1),               # left-to-right ramp
+        np.full(shape, 128, dtype=np.uint8),  # flat frame: no pixel above the mean
+    ]
+    for frame in frames:
+        monkeypatch.setattr(ai_processor, "_phash64", ai_processor._phash64_py)
+        expected = processor._phash(frame)
+        monkeypatch.setattr(ai_processor, "_phash64", lambda gray: int(ai_processor._phash64_jit(np.ascontiguousarray(gray))))
+        assert processor._phash(frame) == expected
@@ -3,88 +3,140 @@ Test script for VMS API endpoints
 Run this after starting the backend server
 """
 
-import requests
+import httpx
 import json
+import msgpack
 import time
 import websocket
+from websockets.sync.client import connect
 import threading
+from concurrent.futures import ThreadPoolExecutor
 
 API_BASE = "http://localhost:8000"
 
+# Gateway errors mean the server (or a proxy in front of it) is restarting or
+# overloaded rather than rejecting the request, so they are worth retrying
+RETRY_STATUSES = {502, 503, 504}
+
+class RetryTransport(httpx.HTTPTransport):
+    """Retry failed connects and transient gateway errors with exponential backoff"""
+    
+    def __init__(self, total: int = 3, backoff_factor: float = 0.2, **kwargs):
+        # retries= covers connection failures; statuses are retried below
+        super().__init__(retries=total, **kwargs)
+        self.total = total
+        self.backoff_factor = backoff_factor
+    
+    def handle_request(self, request):
+        for attempt in range(self.total + 1):
+            response = super().handle_request(request)
+            if response.status_code not in RETRY_STATUSES or attempt == self.total:
+                return response
+            # Drain the body so the connection goes back to the pool and the
+            # retry reuses it instead of reconnecting
+            response.read()
+            response.close()
+            time.sleep(self.backoff_factor * (2 ** attempt))
+
+# One pooled client for the whole suite; HTTP/2 multiplexes the concurrent
+# requests over a single connection when the server (or a TLS proxy) speaks
+# it, and plain HTTP/1.1 still gets keep-alive
+CLIENT = httpx.Client(
+    base_url=API_BASE,
+    timeout=30.0,  # starting a stream can take a while; requests had no timeout
+    transport=RetryTransport(
+        http2=True,
+        limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+    ),
+)
+
 def test_basic_endpoints():
     """Test basic API endpoints"""
     print("=== Testing Basic Endpoints ===")
     
+    # The four GETs are independent, so issue them concurrently
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        root_future = executor.submit(CLIENT.get, "/")
+        streams_future = executor.submit(CLIENT.get, "/streams")
+        models_future = executor.submit(CLIENT.get, "/ai-models")
+        stats_future = executor.submit(CLIENT.get, "/dashboard/stats")
+    
     # Test root endpoint
-    response = requests.get(f"{API_BASE}/")
+    response = root_future.result()
     print(f"Root endpoint: {response.status_code} - {response.json()}")
     
     # Test streams endpoint
-    response = requests.get(f"{API_BASE}/streams")
+    response = streams_future.result()
     print(f"Streams endpoint: {response.status_code}")
     streams_data = response.json()
     print(f"Found {len(streams_data['streams'])} streams")
     
     # Test AI models endpoint
-    response = requests.get(f"{API_BASE}/ai-models")
+    response = models_future.result()
     print(f"AI Models endpoint: {response.status_code}")
     models_data = response.json()
     print(f"Available models: {models_data['models']}")
     
     # Test dashboard stats
-    response = requests.get(f"{API_BASE}/dashboard/stats")
+    response = stats_future.result()
     print(f"Dashboard stats: {response.status_code}")
     stats = response.json()
     print(f"Stats: {stats}")
     
     return streams_data['streams']
 
-def test_stream_operations():
-    """Test stream creation and operations"""
-    print("\n=== Testing Stream Operations ===")
-    
-    # Create a test stream
+def run_stream_lifecycle(stream_id: str):
+    """Create, start, inspect, stop and delete one stream; these steps must stay in order"""
     stream_config = {
-        "stream_id": "test_stream_" + str(int(time.time())),
+        "stream_id": stream_id,
         "source": "webcam",
         "source_path": "0",
         "ai_models": ["object_detection"]
     }
     
     # Create stream
-    response = requests.post(f"{API_BASE}/streams", json=stream_config)
-    print(f"Create stream: {response.status_code}")
+    response = CLIENT.post("/streams", json=stream_config)
+    print(f"[{stream_id}] Create stream: {response.status_code}")
     
     if response.status_code == 200:
-        stream_id = stream_config['stream_id']
-        
         # Start stream
-        response = requests.post(f"{API_BASE}/streams/{stream_id}/start")
-        print(f"Start stream: {response.status_code}")
+        response = CLIENT.post(f"/streams/{stream_id}/start")
+        print(f"[{stream_id}] Start stream: {response.status_code}")
         
         # Wait a bit
         time.sleep(2)
         
         # Check stream status
-        response = requests.get(f"{API_BASE}/streams")
+        response = CLIENT.get("/streams")
         streams = response.json()['streams']
         test_stream = next((s for s in streams if s['stream_id'] == stream_id), None)
         if test_stream:
-            print(f"Stream active: {test_stream['is_active']}")
+            print(f"[{stream_id}] Stream active: {test_stream['is_active']}")
         
         # Stop stream
-        response = requests.post(f"{API_BASE}/streams/{stream_id}/stop")
-        print(f"Stop stream: {response.status_code}")
+        response = CLIENT.post(f"/streams/{stream_id}/stop")
+        print(f"[{stream_id}] Stop stream: {response.status_code}")
         
         # Delete stream
-        response = requests.delete(f"{API_BASE}/streams/{stream_id}")
-        print(f"Delete stream: {response.status_code}")
+        response = CLIENT.delete(f"/streams/{stream_id}")
+        print(f"[{stream_id}] Delete stream: {response.status_code}")
+
+def test_stream_operations(stream_count: int = 3):
+    """Test stream creation and operations"""
+    print("\n=== Testing Stream Operations ===")
+    
+    # Each lifecycle is serial, but several synthetic streams run side by side
+    base_id = "test_stream_" + str(int(time.time()))
+    stream_ids = [f"{base_id}_{i}" for i in range(stream_count)]
+    with ThreadPoolExecutor(max_workers=stream_count) as executor:
+        for future in [executor.submit(run_stream_lifecycle, stream_id) for stream_id in stream_ids]:
+            future.result()
 
 def test_results_endpoint():
     """Test results endpoint"""
     print("\n=== Testing Results Endpoint ===")
     
-    response = requests.get(f"{API_BASE}/results?limit=10")
+    response = CLIENT.get("/results?limit=10")
     print(f"Results endpoint: {response.status_code}")
     
     if response.status_code == 200:
@@ -97,14 +149,30 @@ def test_results_endpoint():
             print(f"Confidence: {latest['confidence']:.2f}, Alert: {latest['alert_level']}")
 
 def on_websocket_message(ws, message):
-    """Handle WebSocket messages"""
+    """Handle WebSocket messages (msgpack frames, or JSON from servers without msgpack)"""
     try:
-        data = json.loads(message)
+        # A server without msgpack installed answers ?format=msgpack with JSON
+        # frames; our messages are maps, so a msgpack frame never starts with '{'
+        if message[:1] in (b"{", "{"):
+            data = json.loads(message)
+        else:
+            data = msgpack.unpackb(message, raw=False)
+        # Bursts of results arrive as one ai_result_batch frame
         if data.get('type') == 'ai_result':
-            result = data['data']
+            results = [data['data']]
+        elif data.get('type') == 'ai_result_batch':
+            results = data['data']
+        else:
+            return
+        
+        for result in results:
             print(f"WS Result: {result['stream_id']} - {result['model_name']} - {result['alert_level']}")
-    except:
-        pass
+    except (ValueError, TypeError) as e:
+        # JSONDecodeError and msgpack's ExtraData/FormatError/StackError are
+        # ValueErrors; an unexpected payload type raises TypeError
+        print(f"WS: could not decode frame: {e}")
+    except (KeyError, AttributeError) as e:
+        print(f"WS: unexpected message shape: {e!r}")
 
 def test_websocket():
     """Test WebSocket connection"""
@@ -112,7 +180,7 @@ def test_websocket():
     
     def run_websocket():
         ws = websocket.WebSocketApp(
-            "ws://localhost:8000/ws",
+            "ws://localhost:8000/ws?format=msgpack",
             on_message=on_websocket_message,
             on_error=lambda ws, error: print(f"WS Error: {error}"),
             on_close=lambda ws, close_status_code, close_msg: print("WS Closed"),
@@ -128,6 +196,21 @@ def test_websocket():
     time.sleep(3)
     print("WebSocket test completed (check output above)")
 
+def test_websocket_compression():
+    """Test that the WebSocket endpoint negotiates permessage-deflate"""
+    print("\n=== Testing WebSocket Compression ===")
+    
+    # websocket-client can't offer the extension; the websockets client
+    # (installed with uvicorn[standard]) offers it by default
+    with connect("ws://localhost:8000/ws") as ws:
+        extensions = ws.response.headers.get("Sec-WebSocket-Extensions", "")
+    
+    if "permessage-deflate" in extensions:
+        print(f"Compression negotiated: {extensions}")
+    else:
+        print("WARNING: Server did not negotiate permessage-deflate")
+    return "permessage-deflate" in extensions
+
 def main():
     """Run all tests"""
     print("VMS API Test Suite")
@@ -146,15 +229,22 @@ def main():
         
         # Test WebSocket
         test_websocket()
+        test_websocket_compression()
         
         print("\n=== Test Summary ===")
         print("All tests completed. Check output above for any errors.")
         
-    except requests.ConnectionError:
+    except httpx.ConnectError:
         print("ERROR: Could not connect to backend server.")
         print("Make sure the backend is running on localhost:8000")
+    except httpx.TimeoutException as e:
+        print(f"ERROR: Backend server did not respond in time: {e!r}")
+    except httpx.TransportError as e:
+        print(f"ERROR: Connection to backend server failed: {e!r}")
     except Exception as e:
         print(f"ERROR: {e}")
+    finally:
+        CLIENT.close()
 
 if __name__ == "__main__":
     main()
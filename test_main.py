@@ -3,40 +3,39 @@
 Simple test script to check if the main components work
 """
 
+import importlib.util
 import sys
 import traceback
+from importlib import metadata
+
+# (module, label, distributions that may provide it)
+REQUIRED_MODULES = [
+    ("fastapi", "FastAPI", ("fastapi",)),
+    ("cv2", "OpenCV", ("opencv-python", "opencv-python-headless", "opencv-contrib-python", "opencv-contrib-python-headless")),
+    ("numpy", "NumPy", ("numpy",)),
+    ("uvicorn", "Uvicorn", ("uvicorn",)),
+]
+
+def _installed_version(distributions):
+    """Read a package version from its metadata without importing it"""
+    for name in distributions:
+        try:
+            return metadata.version(name)
+        except metadata.PackageNotFoundError:
+            continue
+    return "unknown"
 
 def test_imports():
     """Test all required imports"""
     print("Testing imports...")
     
-    try:
-        from fastapi import FastAPI, WebSocket, HTTPException
-        print("✓ FastAPI imports successful")
-    except ImportError as e:
-        print(f"✗ FastAPI import failed: {e}")
-        return False
-    
-    try:
-        import cv2
-        print(f"✓ OpenCV imported successfully (version: {cv2.__version__})")
-    except ImportError as e:
-        print(f"✗ OpenCV import failed: {e}")
-        return False
-    
-    try:
-        import numpy as np
-        print(f"✓ NumPy imported successfully (version: {np.__version__})")
-    except ImportError as e:
-        print(f"✗ NumPy import failed: {e}")
-        return False
-    
-    try:
-        import uvicorn
-        print("✓ Uvicorn imported successfully")
-    except ImportError as e:
-        print(f"✗ Uvicorn import failed: {e}")
-        return False
+    # find_spec locates a package without running its initialisation (OpenCV
+    # alone loads FFmpeg and GUI libraries); tests that need a module import it
+    for module, label, distributions in REQUIRED_MODULES:
+        if importlib.util.find_spec(module) is None:
+            print(f"✗ {label} import failed: No module named '{module}'")
+            return False
+        print(f"✓ {label} available (version: {_installed_version(distributions)})")
         
     return True
 
@@ -70,6 +69,12 @@ def test_local_modules():
     except ImportError as e:
         print(f"✗ AI processor import failed: {e}")
 
+    try:
+        from inference import available_models
+        print(f"✓ Inference module imported successfully: {', '.join(available_models)}")
+    except ImportError as e:
+        print(f"✗ Inference import failed: {e}")
+
 def test_basic_app():
     """Test basic FastAPI app creation"""
     print("\nTesting FastAPI app creation...")
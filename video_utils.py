@@ -1,18 +1,93 @@
 import cv2
 import os
+import json
+import time
 import platform
+import queue
+import shutil
 import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
-def check_video_sources() -> Dict[str, any]:
+try:
+    import pynvml
+except ImportError:
+    pynvml = None
+
+try:
+    import av
+except ImportError:
+    av = None
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
+
+# Probe results are deterministic per machine and OpenCV build, so they are
+# kept on disk between runs and refreshed after CACHE_TTL_SECONDS
+CACHE_PATH = Path.home() / ".cache" / "vms" / "sources.json"
+CACHE_TTL_SECONDS = 3600
+
+def _cache_key() -> str:
+    """Identify the machine and OpenCV build a cached probe belongs to"""
+    return f"{platform.node()}|{cv2.__version__}"
+
+def load_cache() -> Optional[Dict[str, any]]:
+    """
+    Load cached video source info, or None if missing, stale or from another host/OpenCV build
+    """
+    try:
+        if time.time() - CACHE_PATH.stat().st_mtime > CACHE_TTL_SECONDS:
+            return None
+        with open(CACHE_PATH, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    
+    if cached.get("key") != _cache_key():
+        return None
+    return cached.get("sources")
+
+def save_cache(sources: Dict[str, any]) -> None:
+    """
+    Persist video source info for later runs
+    """
+    try:
+        CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        with open(CACHE_PATH, "w", encoding="utf-8") as f:
+            json.dump({"key": _cache_key(), "sources": sources}, f)
+    except (OSError, TypeError) as e:
+        logger.debug(f"Could not write video source cache: {e}")
+
+def check_video_sources(use_cache: bool = True) -> Dict[str, any]:
     """
     Comprehensive check of available video sources
     Returns dict with available sources and their details
+    
+    A probe cached on disk within the last hour is reused unless use_cache is False,
+    which also re-runs the in-process camera, format and system probes.
     """
+    if use_cache:
+        cached = load_cache()
+        # The sample video may have been removed since the probe
+        if cached is not None and (cached.get("sample_video") is None or os.path.exists(cached["sample_video"])):
+            logger.info("Using cached video source check")
+            return cached
+    else:
+        get_available_cameras.cache_clear()
+        get_supported_formats.cache_clear()
+        get_system_info.cache_clear()
+    
     sources = {
         "webcam": None,
         "sample_video": None,
@@ -21,9 +96,9 @@ def check_video_sources() -> Dict[str, any]:
         "system_info": get_system_info()
     }
     
-    # Check webcam availability
-    sources["webcam"] = check_webcam_availability()
+    # Check webcam availability; the webcam flag reuses the camera probe
     sources["available_cameras"] = get_available_cameras()
+    sources["webcam"] = check_webcam_availability()
     
     # Check for sample video files
     sources["sample_video"] = find_sample_video()
@@ -34,100 +109,199 @@ def check_video_sources() -> Dict[str, any]:
     # Log results
     logger.info(f"Video sources check complete: {sources}")
     
+    save_cache(sources)
     return sources
 
 def check_webcam_availability() -> bool:
     """
     Check if webcam is available and accessible
+    
+    Derived from the camera probe, so the default device is only opened once.
     """
     try:
-        # Try to open default camera
-        cap = cv2.VideoCapture(0)
-        if cap.isOpened():
-            # Try to read a frame to ensure it's working
-            ret, frame = cap.read()
-            cap.release()
-            if ret and frame is not None:
-                logger.info("Webcam is available and working")
-                return True
-            else:
-                logger.warning("Webcam detected but failed to capture frame")
-                return False
-        else:
-            logger.warning("No webcam detected")
-            return False
+        if any(camera["index"] == 0 and camera["working"] for camera in get_available_cameras()):
+            logger.info("Webcam is available and working")
+            return True
+        logger.warning("No working webcam detected")
+        return False
     except Exception as e:
         logger.error(f"Error checking webcam: {e}")
         return False
 
+def _probe_camera(index: int) -> Optional[Dict[str, any]]:
+    """
+    Open a single camera index and return its details, or None if unusable
+    """
+    try:
+        cap = cv2.VideoCapture(index)
+        if not cap.isOpened():
+            cap.release()
+            return None
+
+        # Get camera properties
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        fps = cap.get(cv2.CAP_PROP_FPS)
+
+        # Try to capture a frame to verify it works
+        ret, frame = cap.read()
+        cap.release()
+
+        if ret and frame is not None:
+            logger.info(f"Found working camera {index}: {width}x{height} @ {fps}fps")
+            return {
+                "index": index,
+                "width": width,
+                "height": height,
+                "fps": fps,
+                "working": True
+            }
+
+        logger.warning(f"Camera {index} detected but not working properly")
+        return None
+    except Exception as e:
+        logger.debug(f"Error checking camera {index}: {e}")
+        return None
+
+@lru_cache(maxsize=1)
 def get_available_cameras() -> List[Dict[str, any]]:
     """
     Get list of available cameras with their details
     """
-    cameras = []
+    # Opening a missing index can block on the driver, so probe the first
+    # 10 indices concurrently rather than one after another
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        results = list(executor.map(_probe_camera, range(10)))
+
+    return [camera for camera in results if camera is not None]
+
+# Common sample video locations, in priority order
+SAMPLE_VIDEO_SEARCH_PATHS = [
+    "sample_videos/",
+    "test_videos/",
+    "uploads/",
+    "./",
+    "../samples/",
+    Path.home() / "Videos",
+]
+
+# Common video extensions, in priority order
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv', '.webm')
+
+# Video files in each watched search path, kept current by a watchdog
+# observer so repeat lookups don't list the directories again
+_VIDEO_INDEX: Dict[str, set] = {}
+_video_index_lock = threading.Lock()
+_video_observer = None
+
+def _scan_video_dir(path: Path) -> set:
+    """
+    List the video files directly inside a directory
+    """
+    with os.scandir(path) as entries:
+        return {
+            str(path / entry.name) for entry in entries
+            if os.path.splitext(entry.name)[1].lower() in VIDEO_EXTENSIONS and entry.is_file()
+        }
+
+class _VideoIndexHandler(FileSystemEventHandler):
+    """
+    Apply file events from one search path to its _VIDEO_INDEX entry
+    """
+    def __init__(self, search_path: str):
+        super().__init__()
+        self.search_path = search_path
+        self.path = Path(search_path)
+        self.abs_dir = os.path.abspath(self.path)
     
-    # Check first 10 camera indices
-    for i in range(10):
-        try:
-            cap = cv2.VideoCapture(i)
-            if cap.isOpened():
-                # Get camera properties
-                width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-                height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-                fps = cap.get(cv2.CAP_PROP_FPS)
-                
-                # Try to capture a frame to verify it works
-                ret, frame = cap.read()
-                cap.release()
-                
-                if ret and frame is not None:
-                    camera_info = {
-                        "index": i,
-                        "width": width,
-                        "height": height,
-                        "fps": fps,
-                        "working": True
-                    }
-                    cameras.append(camera_info)
-                    logger.info(f"Found working camera {i}: {width}x{height} @ {fps}fps")
-                else:
-                    logger.warning(f"Camera {i} detected but not working properly")
+    def _update(self, file_path: str, present: bool):
+        name = os.path.basename(file_path)
+        # Moves out of the directory also report a destination elsewhere
+        if os.path.splitext(name)[1].lower() not in VIDEO_EXTENSIONS or os.path.abspath(os.path.dirname(file_path)) != self.abs_dir:
+            return
+        
+        video_path = str(self.path / name)
+        with _video_index_lock:
+            videos = _VIDEO_INDEX.setdefault(self.search_path, set())
+            if present:
+                videos.add(video_path)
             else:
-                cap.release()
+                videos.discard(video_path)
+    
+    def on_created(self, event):
+        if not event.is_directory:
+            self._update(event.src_path, True)
+    
+    def on_deleted(self, event):
+        if not event.is_directory:
+            self._update(event.src_path, False)
+    
+    def on_moved(self, event):
+        if not event.is_directory:
+            self._update(event.src_path, False)
+            self._update(event.dest_path, True)
+
+def start_video_index() -> bool:
+    """
+    Index the sample video directories once and watch them for changes
+    
+    Returns False when watchdog is not installed or the watch can't be set up;
+    find_sample_video then lists the directories on every call.
+    """
+    global _video_observer
+    if Observer is None:
+        return False
+    
+    with _video_index_lock:
+        if _video_observer is not None:
+            return True
+        
+        try:
+            observer = Observer()
+            observer.daemon = True
+            for search_path in SAMPLE_VIDEO_SEARCH_PATHS:
+                path = Path(search_path)
+                if not path.is_dir():
+                    continue
+                _VIDEO_INDEX[str(search_path)] = _scan_video_dir(path)
+                observer.schedule(_VideoIndexHandler(str(search_path)), str(path), recursive=False)
+            observer.start()
         except Exception as e:
-            logger.debug(f"Error checking camera {i}: {e}")
-            continue
+            logger.debug(f"Could not watch sample video directories: {e}")
+            _VIDEO_INDEX.clear()
+            return False
+        
+        _video_observer = observer
     
-    return cameras
+    logger.info(f"Watching {len(_VIDEO_INDEX)} sample video directories")
+    return True
 
 def find_sample_video() -> Optional[str]:
     """
     Find sample video files for testing
     """
-    # Common sample video locations
-    search_paths = [
-        "sample_videos/",
-        "test_videos/",
-        "uploads/",
-        "./",
-        "../samples/",
-        Path.home() / "Videos",
-    ]
+    start_video_index()
     
-    # Common video extensions
-    video_extensions = ['.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv', '.webm']
-    
-    for search_path in search_paths:
+    for search_path in SAMPLE_VIDEO_SEARCH_PATHS:
         try:
-            path = Path(search_path)
-            if path.exists() and path.is_dir():
-                for ext in video_extensions:
-                    video_files = list(path.glob(f"*{ext}"))
-                    if video_files:
-                        sample_video = str(video_files[0])
-                        if validate_video_file(sample_video):
-                            logger.info(f"Found sample video: {sample_video}")
-                            return sample_video
+            with _video_index_lock:
+                indexed = _VIDEO_INDEX.get(str(search_path))
+                videos = set(indexed) if indexed is not None else None
+            
+            # Directories outside the index (no watchdog, or created since
+            # the watch started) get one listing
+            if videos is None:
+                path = Path(search_path)
+                if not path.is_dir():
+                    continue
+                videos = _scan_video_dir(path)
+            
+            # Try one file per extension, in extension priority order
+            for ext in VIDEO_EXTENSIONS:
+                sample_video = min((video for video in videos if video.lower().endswith(ext)), default=None)
+                if sample_video and validate_video_file(sample_video):
+                    logger.info(f"Found sample video: {sample_video}")
+                    return sample_video
         except Exception as e:
             logger.debug(f"Error searching in {search_path}: {e}")
     
@@ -143,6 +317,15 @@ def validate_video_file(video_path: str) -> bool:
     """
     Validate that a video file can be opened and read
     """
+    # Reading the container header is enough to find a video stream, and
+    # skips decoding a frame; anything PyAV can't parse goes through OpenCV
+    if av is not None:
+        try:
+            with av.open(video_path) as container:
+                return bool(container.streams.video)
+        except Exception as e:
+            logger.debug(f"PyAV could not open {video_path}, falling back to OpenCV: {e}")
+    
     try:
         cap = cv2.VideoCapture(video_path)
         if cap.isOpened():
@@ -154,6 +337,32 @@ def validate_video_file(video_path: str) -> bool:
         logger.error(f"Error validating video {video_path}: {e}")
         return False
 
+def _pick_encoder(output_path: str, fps: int, frame_size: Tuple[int, int]) -> Optional[cv2.VideoWriter]:
+    """
+    Open a video writer, preferring a hardware H.264 encoder over software mp4v
+    """
+    # With VIDEO_ACCELERATION_ANY the FFmpeg backend tries its GPU encoders
+    # (NVENC, QuickSync, VAAPI, Media Foundation, ...) but may still open a
+    # software H.264 encoder when none is usable, so check what it picked
+    out = cv2.VideoWriter(output_path, cv2.CAP_FFMPEG, cv2.VideoWriter_fourcc(*'avc1'), fps, frame_size, [
+        cv2.VIDEOWRITER_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY
+    ])
+    if out.isOpened():
+        acceleration = out.get(cv2.VIDEOWRITER_PROP_HW_ACCELERATION)
+        if acceleration not in (-1, cv2.VIDEO_ACCELERATION_NONE):
+            logger.info(f"Encoding test video with hardware-accelerated H.264 (acceleration type {int(acceleration)})")
+            return out
+        # Software H.264 is slower than mp4v for a throwaway test clip
+        logger.debug("H.264 writer opened without hardware acceleration, using mp4v instead")
+    out.release()
+    
+    out = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, frame_size)
+    if out.isOpened():
+        logger.info("Encoding test video with software mp4v")
+        return out
+    out.release()
+    return None
+
 def create_test_video(duration: int = 10) -> Optional[str]:
     """
     Create a simple test video if no sample videos are found
@@ -166,36 +375,80 @@ def create_test_video(duration: int = 10) -> Optional[str]:
         fps = 30
         
         # Create video writer
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
+        out = _pick_encoder(output_path, fps, (width, height))
         
-        if not out.isOpened():
+        if out is None:
             logger.error("Failed to create test video writer")
             return None
         
         # Generate frames
         total_frames = duration * fps
-        for frame_num in range(total_frames):
-            # Create a simple animated frame
-            frame = np.zeros((height, width, 3), dtype=np.uint8)
-            
-            # Add moving circle
-            center_x = int(width * (0.5 + 0.3 * np.sin(2 * np.pi * frame_num / fps)))
-            center_y = height // 2
-            cv2.circle(frame, (center_x, center_y), 30, (0, 255, 255), -1)
-            
-            # Add frame counter
-            cv2.putText(frame, f"Frame {frame_num}", (10, 30), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-            
-            # Add timestamp
-            timestamp = f"Time: {frame_num/fps:.1f}s"
-            cv2.putText(frame, timestamp, (10, height - 10), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-            
-            out.write(frame)
+        center_y = height // 2
+        frame_nums = np.arange(total_frames)
+        # Circle positions for every frame in one vectorized pass
+        centers_x = (width * (0.5 + 0.3 * np.sin(2 * np.pi * frame_nums / fps))).astype(np.int32)
+        
+        # Drawing and encoding overlap: a producer thread draws frames into a
+        # bounded queue while this thread encodes them (OpenCV releases the
+        # GIL in both). Frame buffers are recycled through a free list rather
+        # than allocated per frame; the writer copies each frame it is given
+        background = np.zeros((height, width, 3), dtype=np.uint8)
+        queue_size = 4
+        # Queued frames plus the one being drawn and the one being encoded
+        free_buffers = queue.Queue()
+        for _ in range(queue_size + 2):
+            free_buffers.put(np.empty_like(background))
+        frames = queue.Queue(maxsize=queue_size)
+        stop = threading.Event()
+        
+        def draw_frames():
+            try:
+                for frame_num in range(total_frames):
+                    if stop.is_set():
+                        break
+                    frame = free_buffers.get()
+                    np.copyto(frame, background)
+                    
+                    # Add moving circle
+                    cv2.circle(frame, (int(centers_x[frame_num]), center_y), 30, (0, 255, 255), -1)
+                    
+                    # Add frame counter
+                    cv2.putText(frame, f"Frame {frame_num}", (10, 30), 
+                               cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+                    
+                    # Add timestamp
+                    timestamp = f"Time: {frame_num/fps:.1f}s"
+                    cv2.putText(frame, timestamp, (10, height - 10), 
+                               cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+                    
+                    frames.put(frame)
+            except Exception as e:
+                logger.error(f"Error drawing test video frames: {e}")
+            finally:
+                frames.put(None)
         
-        out.release()
+        producer = threading.Thread(target=draw_frames, daemon=True)
+        producer.start()
+        try:
+            while True:
+                frame = frames.get()
+                if frame is None:
+                    break
+                out.write(frame)
+                free_buffers.put(frame)
+        finally:
+            # If encoding failed the producer may be blocked on either queue:
+            # stop it, keep both queues moving until it exits, then close the
+            # writer so the file is finalized
+            stop.set()
+            while producer.is_alive():
+                try:
+                    frame = frames.get_nowait()
+                    if frame is not None:
+                        free_buffers.put(frame)
+                except queue.Empty:
+                    producer.join(timeout=0.05)
+            out.release()
         
         # Verify the created video
         if validate_video_file(output_path):
@@ -209,53 +462,81 @@ def create_test_video(duration: int = 10) -> Optional[str]:
         logger.error(f"Error creating test video: {e}")
         return None
 
+# Common formats that OpenCV typically supports, with the FOURCC each is
+# probed with (XVID where nothing more specific applies)
+_FOURCC_TABLE = {
+    fmt: cv2.VideoWriter_fourcc(*fourcc) for fmt, fourcc in [
+        ('mp4', 'mp4v'), ('avi', 'XVID'), ('mov', 'mp4v'), ('mkv', 'XVID'),
+        ('wmv', 'WMV2'), ('flv', 'FLV1'), ('webm', 'VP80'), ('mpg', 'XVID'),
+        ('mpeg', 'XVID'), ('3gp', 'XVID'), ('ogv', 'XVID'), ('m4v', 'XVID'),
+    ]
+}
+
+# Writer backends that can mux these containers; OpenCV's built-in writers
+# only handle MJPEG AVI and image sequences
+_CONTAINER_WRITER_BACKENDS = (cv2.CAP_FFMPEG, cv2.CAP_GSTREAMER)
+
+@lru_cache(maxsize=1)
 def get_supported_formats() -> List[str]:
     """
     Get list of supported video formats
     """
-    # Common formats that OpenCV typically supports
-    common_formats = [
-        'mp4', 'avi', 'mov', 'mkv', 'wmv', 'flv', 'webm', 
-        'mpg', 'mpeg', '3gp', 'ogv', 'm4v'
-    ]
-    
     supported = []
     
-    # Test each format by trying to create a VideoWriter
-    for fmt in common_formats:
-        try:
-            fourcc_codes = {
-                'mp4': 'mp4v',
-                'avi': 'XVID',
-                'mov': 'mp4v',
-                'mkv': 'XVID',
-                'wmv': 'WMV2',
-                'flv': 'FLV1',
-                'webm': 'VP80'
-            }
-            
-            fourcc = fourcc_codes.get(fmt, 'XVID')
-            test_writer = cv2.VideoWriter(
-                f"test.{fmt}", 
-                cv2.VideoWriter_fourcc(*fourcc), 
-                30, 
-                (640, 480)
-            )
-            
-            if test_writer.isOpened():
-                supported.append(fmt)
+    writer_backends = cv2.videoio_registry.getWriterBackends()
+    if not any(backend in writer_backends for backend in _CONTAINER_WRITER_BACKENDS):
+        logger.warning("No FFmpeg or GStreamer writer backend available, no video formats supported")
+        return supported
+    
+    # Test each format by trying to create a VideoWriter. Probe files go into
+    # a scratch directory that is removed in one go, so nothing is written
+    # to (or deleted from) the working directory
+    with tempfile.TemporaryDirectory(prefix="vms-formats-") as probe_dir:
+        for fmt, fourcc in _FOURCC_TABLE.items():
+            try:
+                test_writer = cv2.VideoWriter(
+                    os.path.join(probe_dir, f"probe.{fmt}"), 
+                    fourcc, 
+                    30, 
+                    (640, 480)
+                )
+                
+                if test_writer.isOpened():
+                    supported.append(fmt)
                 test_writer.release()
-                # Clean up test file
-                try:
-                    os.remove(f"test.{fmt}")
-                except:
-                    pass
-        except Exception as e:
-            logger.debug(f"Format {fmt} not supported: {e}")
+            except Exception as e:
+                logger.debug(f"Format {fmt} not supported: {e}")
     
     logger.info(f"Supported video formats: {supported}")
     return supported
 
+def _get_nvidia_gpus() -> List[str]:
+    """
+    Get NVIDIA GPU names through NVML, without spawning a process
+    """
+    if pynvml is None:
+        return []
+    
+    try:
+        pynvml.nvmlInit()
+    except Exception as e:
+        logger.debug(f"NVML not available: {e}")
+        return []
+    
+    try:
+        names = []
+        for i in range(pynvml.nvmlDeviceGetCount()):
+            name = pynvml.nvmlDeviceGetName(pynvml.nvmlDeviceGetHandleByIndex(i))
+            # Older bindings return bytes
+            names.append(name.decode() if isinstance(name, bytes) else name)
+        return names
+    except Exception as e:
+        logger.debug(f"Could not query NVML devices: {e}")
+        return []
+    finally:
+        pynvml.nvmlShutdown()
+
+@lru_cache(maxsize=1)
 def get_system_info() -> Dict[str, str]:
     """
     Get system information relevant to video processing
@@ -268,15 +549,22 @@ def get_system_info() -> Dict[str, str]:
     }
     
     # Add GPU information if available
+    nvidia_gpus = _get_nvidia_gpus()
+    if nvidia_gpus:
+        info["gpu"] = nvidia_gpus
+        return info
+    
+    # Fall back to the system tools, skipping the spawn entirely when the tool
+    # is not installed (wmic is gone from recent Windows builds)
     try:
-        if platform.system() == "Windows":
+        if platform.system() == "Windows" and shutil.which('wmic'):
             # Try to get GPU info on Windows
             result = subprocess.run(['wmic', 'path', 'win32_VideoController', 'get', 'name'], 
                                   capture_output=True, text=True, timeout=5)
             if result.returncode == 0:
                 gpu_info = result.stdout.strip().split('\n')[1:]
                 info["gpu"] = [gpu.strip() for gpu in gpu_info if gpu.strip()]
-        elif platform.system() == "Linux":
+        elif platform.system() == "Linux" and shutil.which('lspci'):
             # Try to get GPU info on Linux
             result = subprocess.run(['lspci', '-nn'], capture_output=True, text=True, timeout=5)
             if result.returncode == 0:
@@ -288,6 +576,25 @@ def get_system_info() -> Dict[str, str]:
     
     return info
 
+def open_accelerated_capture(source: str) -> cv2.VideoCapture:
+    """
+    Open an RTSP stream or video file with hardware decoding when available
+    
+    Hardware acceleration is an open-time parameter: it has no effect when set
+    on an already opened capture. It needs OpenCV built with FFmpeg
+    (WITH_FFMPEG=ON) and an FFmpeg with GPU decoders (NVDEC, QuickSync,
+    VAAPI, D3D11); otherwise this falls back to the default backend.
+    """
+    cap = cv2.VideoCapture(source, cv2.CAP_FFMPEG, [
+        cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY
+    ])
+    if cap.isOpened():
+        return cap
+    
+    cap.release()
+    logger.info(f"Hardware-accelerated open failed for {source}, using default backend")
+    return cv2.VideoCapture(source)
+
 def test_rtsp_connection(rtsp_url: str, timeout: int = 10) -> Dict[str, any]:
     """
     Test RTSP connection and get stream information
@@ -300,7 +607,7 @@ def test_rtsp_connection(rtsp_url: str, timeout: int = 10) -> Dict[str, any]:
     }
     
     try:
-        cap = cv2.VideoCapture(rtsp_url)
+        cap = open_accelerated_capture(rtsp_url)
         cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
         
         # Set timeout for opening
@@ -353,6 +660,12 @@ def optimize_capture_settings(cap: cv2.VideoCapture, source_type: str = "webcam"
             # File optimizations
             cap.set(cv2.CAP_PROP_BUFFERSIZE, 3)  # Slightly larger buffer for files
         
+        if source_type in ("rtsp", "file"):
+            # Decode acceleration can't be switched on here, only at open time
+            # (see open_accelerated_capture); report what the capture got
+            if cap.get(cv2.CAP_PROP_HW_ACCELERATION) in (-1, cv2.VIDEO_ACCELERATION_NONE):
+                logger.debug(f"{source_type} capture is using software decoding; open it with open_accelerated_capture for hardware decoding")
+        
         logger.info(f"Optimized capture settings for {source_type}")
         return True
         